@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Query
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
@@ -9,30 +9,26 @@ import jwt
 import pymongo
 from bson import ObjectId
 from fastapi import Depends
-from app import get_chat_agent, get_retriever
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage, messages_to_dict, messages_from_dict
+from contextlib import asynccontextmanager
+from app import SEARCH_TOOL_NAME, get_chat_agent, arun_tool_calls, start_speculative_search, get_speculative_search_stats, get_retriever, get_byte_store, get_redis_client, get_async_redis_client, get_session_store, get_lexical_index, get_batching_stats
+from search_cache import bump_corpus_version
+from registry import registry
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
 from langchain_core.documents import Document
+from docstore_codec import decode_document
 import uvicorn
-import json
+import asyncio
 import uuid
 import shutil
 import os
-import pymupdf4llm
 from utils import RagProcessor
+from groq_pool import key_pool_stats
+from streaming import TEXT, FrameCoalescer, ThinkingTagParser, encode_frame, paced
 from dotenv import load_dotenv
-from app import POSTGRES_CONNECTION_STRING
-import psycopg2
-import chromadb
 
-
-import redis
 import pickle
 load_dotenv()
 
-redis_host = os.getenv('REDIS_HOST', 'localhost')
-redis_port = int(os.getenv('REDIS_PORT', 6379))
-redis_client = redis.Redis(host=redis_host, port=redis_port, db=0, decode_responses=False)
-
 class QueueStatus(BaseModel):
     queue_size: int
     processed_count: int
@@ -46,6 +42,13 @@ class AdminDocument(BaseModel):
     content: str
     type: str
 
+class AdminDocumentSummary(BaseModel):
+    id: str
+    source_url: str
+    title: str
+    snippet: str
+    type: str
+
 class CrawlRequest(BaseModel):
     pages: int = 20
 
@@ -55,6 +58,9 @@ class ChatRequest(BaseModel):
 
 ENVIRONMENT = os.getenv("ENV", "development")
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key")
+# Streamed chunks are merged into one NDJSON frame until either budget is reached.
+STREAM_FRAME_MAX_CHARS = int(os.getenv("STREAM_FRAME_MAX_CHARS", 256))
+STREAM_FRAME_MAX_DELAY_MS = float(os.getenv("STREAM_FRAME_MAX_DELAY_MS", 40))
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
 
 # Database Connection
@@ -67,8 +73,6 @@ except Exception as e:
     print(f"Failed to connect to MongoDB: {e}")
     users_collection = None
 
-retriever = get_retriever()
-
 class AuthMiddleware(BaseHTTPMiddleware):
     async def dispatch(
         self, request: Request, call_next: RequestResponseEndpoint
@@ -101,8 +105,19 @@ class AuthMiddleware(BaseHTTPMiddleware):
         response = await call_next(request)
         return response
 
+def _bump_corpus_version():
+    return bump_corpus_version(get_redis_client())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Models and clients load in the background so the worker accepts connections immediately;
+    # /ready reports when they are warm.
+    registry.warmup()
+    yield
+
 app = FastAPI(
-    root_path="/chat" if ENVIRONMENT == "production" else ""
+    root_path="/chat" if ENVIRONMENT == "production" else "",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -139,15 +154,10 @@ async def get_admin_user(user_id: str = Depends(get_current_user)):
         print(f"Admin check failed: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error during auth check")
 
-print("Initializing Agent...")
-try:
-    llm_with_tools, tools = get_chat_agent()
-    tools_map = {t.name: t for t in tools}
-    print("Agent Initialized Successfully.")
-except Exception as e:
-    print(f"Failed to initialize agent: {e}")
-    llm_with_tools = None
-    tools_map = {}
+@app.get("/ready")
+async def ready():
+    status = registry.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
 
 SYSTEM_MESSAGE = SystemMessage(content="""You are WikiNITT, an intelligent and deep-thinking AI assistant for NIT Trichy.
 
@@ -174,32 +184,37 @@ PROCESS:
 """)
 
 async def chat_generator(user_input: str, session_id: str):
+    llm_with_tools, tools = await asyncio.to_thread(get_chat_agent)
+    tools_map = {t.name: t for t in tools}
     if not llm_with_tools:
-        yield json.dumps({"error": "Agent not initialized"}) + "\n"
+        yield encode_frame({"error": "Agent not initialized"})
         return
 
-    redis_key = f"session:{session_id}"
-    
-    raw_history = redis_client.get(redis_key)
-    if raw_history:
-        try:
-            chat_history = messages_from_dict(json.loads(raw_history))
-        except Exception as e:
-            print(f"Error loading history for {session_id}: {e}")
-            chat_history = []
-    else:
+    # Most turns start by searching for something close to the message itself, so that search
+    # runs alongside history loading and the first LLM call.
+    speculative = start_speculative_search(user_input) if SEARCH_TOOL_NAME in tools_map else None
+
+    session_store = await asyncio.to_thread(get_session_store)
+    try:
+        chat_history = await session_store.load(session_id)
+    except Exception as e:
+        print(f"Error loading history for {session_id}: {e}")
         chat_history = []
 
     messages = [SYSTEM_MESSAGE] + chat_history + [HumanMessage(content=user_input)]
     
+    frames = FrameCoalescer(max_chars=STREAM_FRAME_MAX_CHARS, max_delay_ms=STREAM_FRAME_MAX_DELAY_MS)
     try:
         while True:
             full_response = None
+            parser = ThinkingTagParser()
             
-            buffer = ""
-            is_thinking = False
-            
-            for chunk in llm_with_tools.stream(messages):
+            # paced() also wakes up when buffered text is due, so a stalled model cannot hold it back.
+            async for chunk, due in paced(llm_with_tools.astream(messages), frames):
+                for frame in due:
+                    yield frame
+                if chunk is None:
+                    continue
                 if full_response is None:
                     full_response = chunk
                 else:
@@ -207,102 +222,43 @@ async def chat_generator(user_input: str, session_id: str):
                 
                 content = chunk.content
                 if content and isinstance(content, str):
-                    buffer += content
-                    
-                    while True:
-                        if is_thinking:
-                            end_tag = "</thinking>"
-                            if end_tag in buffer:
-                                thought, rest = buffer.split(end_tag, 1)
-                                yield json.dumps({"type": "thought_chunk", "content": thought}) + "\n"
-                                buffer = rest
-                                is_thinking = False
-                            else:
-                                # Check for partial end tag at the end
-                                match_len = 0
-                                for i in range(1, len(end_tag)):
-                                    if buffer.endswith(end_tag[:i]):
-                                        match_len = i
-                                
-                                if match_len > 0:
-                                    to_yield = buffer[:-match_len]
-                                    buffer = buffer[-match_len:]
-                                    if to_yield:
-                                        yield json.dumps({"type": "thought_chunk", "content": to_yield}) + "\n"
-                                else:
-                                    yield json.dumps({"type": "thought_chunk", "content": buffer}) + "\n"
-                                    buffer = ""
-                                break
-                        else:
-                            start_tag = "<thinking>"
-                            if start_tag in buffer:
-                                text, rest = buffer.split(start_tag, 1)
-                                if text:
-                                    yield json.dumps({"type": "text_chunk", "content": text}) + "\n"
-                                buffer = rest
-                                is_thinking = True
-                            else:
-                                # Check for partial start tag at the end
-                                match_len = 0
-                                for i in range(1, len(start_tag)):
-                                    if buffer.endswith(start_tag[:i]):
-                                        match_len = i
-                                
-                                if match_len > 0:
-                                    to_yield = buffer[:-match_len]
-                                    buffer = buffer[-match_len:]
-                                    if to_yield:
-                                        yield json.dumps({"type": "text_chunk", "content": to_yield}) + "\n"
-                                else:
-                                    yield json.dumps({"type": "text_chunk", "content": buffer}) + "\n"
-                                    buffer = ""
-                                break
+                    for frame in frames.add_segments(parser.feed(content)):
+                        yield frame
             
-            # Flush remaining buffer
-            if buffer:
-                if is_thinking:
-                    yield json.dumps({"type": "thought_chunk", "content": buffer}) + "\n"
-                else:
-                    yield json.dumps({"type": "text_chunk", "content": buffer}) + "\n"
+            for frame in frames.add_segments(parser.flush()) + frames.flush():
+                yield frame
 
             messages.append(full_response)
             
             if full_response.tool_calls:
                 if len(messages) > 30:
-                    yield json.dumps({"type": "error", "content": "Max recursion limit reached."}) + "\n"
+                    yield encode_frame({"type": "error", "content": "Max recursion limit reached."})
                     return
 
                 for tool_call in full_response.tool_calls:
-                    tool_name = tool_call["name"]
-                    tool_args = tool_call["args"]
-                    
-                    if tool_name in tools_map:
-                        yield json.dumps({"type": "status", "content": f"Searching: {tool_args.get('query', '...')}"}) + "\n"
-                        
-                        try:
-                            # Execute tool
-                            tool_result = tools_map[tool_name].invoke(tool_args)
-                        except Exception as tool_err:
-                            tool_result = f"Error executing tool: {tool_err}"
-                        
-                        messages.append(ToolMessage(
-                            tool_call_id=tool_call["id"],
-                            content=str(tool_result)
-                        ))
-                    else:
-                        messages.append(ToolMessage(
-                            tool_call_id=tool_call["id"],
-                            content=f"Error: Tool '{tool_name}' not found."
-                        ))
+                    if tool_call["name"] in tools_map:
+                        yield encode_frame({"type": "status", "content": f"Searching: {tool_call['args'].get('query', '...')}"})
+
+                # The calls of one step are independent, so they run together.
+                tool_results = await arun_tool_calls(full_response.tool_calls, tools_map, speculative)
+                if speculative is not None:
+                    speculative.discard()
+                    speculative = None
+                for tool_call, tool_result in zip(full_response.tool_calls, tool_results):
+                    messages.append(ToolMessage(
+                        tool_call_id=tool_call["id"],
+                        content=tool_result
+                    ))
                 continue
             
             else:
-                chat_history.append(HumanMessage(content=user_input))
-                chat_history.append(AIMessage(content=str(full_response.content)))
-                
+                # Only the answer is kept; replaying old <thinking> blocks would just spend the history budget.
+                answer_parser = ThinkingTagParser()
+                segments = answer_parser.feed(str(full_response.content)) + answer_parser.flush()
+                answer = "".join(text for kind, text in segments if kind == TEXT).strip()
+
                 try:
-                    serialized_history = json.dumps(messages_to_dict(chat_history))
-                    redis_client.setex(redis_key, 86400, serialized_history)
+                    await session_store.append(session_id, user_input, answer)
                 except Exception as e:
                     print(f"Error saving history to Redis: {e}")
                     
@@ -310,7 +266,11 @@ async def chat_generator(user_input: str, session_id: str):
 
     except Exception as e:
         print(f"Error processing chat: {e}")
-        yield json.dumps({"type": "error", "content": str(e)}) + "\n"
+        for frame in frames.event({"type": "error", "content": str(e)}):
+            yield frame
+    finally:
+        if speculative is not None:
+            speculative.discard()
 
 GROQ_API_KEYS = []
 if os.getenv("GROQ_API_KEYS"):
@@ -319,49 +279,81 @@ if os.getenv("GROQ_API_KEYS"):
 rag_processor = RagProcessor(GROQ_API_KEYS)
 
 @app.get("/admin/documents", dependencies=[Depends(get_admin_user)])
-async def list_documents(page: int = 1, limit: int = 20, search: str = None):
+async def list_documents(
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    search: str = None,
+    type: str = None,
+    source_url_prefix: str = None,
+    cursor: str = None,
+    fields: str = "full",
+):
+    retriever = await asyncio.to_thread(get_retriever)
     if not retriever:
         raise HTTPException(status_code=500, detail="Retriever not initialized")
-    
-    store = retriever.docstore
-    
-    all_keys = list(store.yield_keys())
-    current_docs = []
-    
-    retrieved_docs = store.mget(all_keys)
-    
-    for i, doc in enumerate(retrieved_docs):
-        if doc:
-            if search:
-                search_lower = search.lower()
-                title_match = search_lower in doc.metadata.get("title", "").lower()
-                content_match = search_lower in doc.page_content.lower()
-                if not (title_match or content_match):
-                    continue
+    if fields not in ("full", "snippet"):
+        raise HTTPException(status_code=400, detail="fields must be 'full' or 'snippet'")
 
-            current_docs.append(AdminDocument(
-                id=all_keys[i],
-                source_url=doc.metadata.get("source_url", ""),
-                title=doc.metadata.get("title", "Untitled"),
-                content=doc.page_content,
-                type=doc.metadata.get("content_type", "unknown")
+    # Filtering, ranking and paging happen in Postgres; only the rows on this page are read and decoded.
+    # A cursor continues from the previous page via keyset pagination; `page` is kept for offset-based clients.
+    pg_store = (await asyncio.to_thread(get_byte_store)).store
+    try:
+        rows, next_cursor = await pg_store.alist_documents(
+            query=search,
+            content_type=type,
+            source_url_prefix=source_url_prefix,
+            limit=limit,
+            offset=0 if cursor else (page - 1) * limit,
+            cursor=cursor,
+            snippet=fields == "snippet",
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    total_docs = await pg_store.aestimate_documents(
+        query=search,
+        content_type=type,
+        source_url_prefix=source_url_prefix,
+    )
+
+    sliced_docs = []
+    for row in rows:
+        if fields == "snippet":
+            sliced_docs.append(AdminDocumentSummary(
+                id=row["key"],
+                source_url=row["source_url"] or "",
+                title=row["title"] or "Untitled",
+                snippet=row["body"] or "",
+                type=row["content_type"] or "unknown"
             ))
-            
-    total_docs = len(current_docs)
-    
-    # Calculate slice
-    start = (page - 1) * limit
-    end = start + limit
-    sliced_docs = current_docs[start:end]
+            continue
+
+        # Metadata can hold lists or None; the indexed columns are already plain text.
+        doc = decode_document(row["body"])
+        sliced_docs.append(AdminDocument(
+            id=row["key"],
+            source_url=row["source_url"] or "",
+            title=row["title"] or "Untitled",
+            content=doc.page_content,
+            type=row["content_type"] or "unknown"
+        ))
 
     return {
         "items": sliced_docs,
         "total": total_docs,
+        "total_is_estimate": True,
+        "next_cursor": next_cursor,
         "page": page,
         "size": limit,
-        "pages": (total_docs + limit - 1) // limit if limit > 0 else 1
+        "pages": (total_docs + limit - 1) // limit
     }
 
+@app.post("/admin/documents/backfill", dependencies=[Depends(get_admin_user)])
+async def backfill_documents():
+    # Populates the indexed metadata columns for rows stored before they existed.
+    pg_store = (await asyncio.to_thread(get_byte_store)).store
+    updated = await asyncio.to_thread(pg_store.backfill_metadata)
+    return {"status": "success", "message": f"Backfilled {updated} documents"}
+
 @app.post("/admin/parse-pdf", dependencies=[Depends(get_admin_user)])
 async def parse_pdf(file: UploadFile = File(...)):
     temp_file = f"temp_{uuid.uuid4()}.pdf"
@@ -370,6 +362,7 @@ async def parse_pdf(file: UploadFile = File(...)):
             shutil.copyfileobj(file.file, buffer)
             
         print("Extracting base text with pymupdf4llm...")
+        import pymupdf4llm
         md_text = pymupdf4llm.to_markdown(temp_file)
         
         try:
@@ -409,6 +402,7 @@ async def parse_pdf(file: UploadFile = File(...)):
 
 @app.post("/admin/documents", dependencies=[Depends(get_admin_user)])
 async def add_document(doc: AdminDocument, process: bool = False):
+    retriever = await asyncio.to_thread(get_retriever)
     if not retriever:
         raise HTTPException(status_code=500, detail="Retriever not initialized")
     
@@ -425,7 +419,7 @@ async def add_document(doc: AdminDocument, process: bool = False):
     }
     
     if process:
-        processed = rag_processor.process_document(doc.content, doc.source_url)
+        processed = await asyncio.to_thread(rag_processor.process_document, doc.content, doc.source_url)
         if processed:
             final_content = processed["content"]
             final_metadata.update(processed["metadata"])
@@ -441,24 +435,23 @@ async def add_document(doc: AdminDocument, process: bool = False):
     if len([new_doc]) != len([doc_id]):
          raise HTTPException(status_code=500, detail="Internal Error: Document/ID mismatch preprocessing.")
     try:
-        if hasattr(retriever, 'aadd_documents'):
-            await retriever.aadd_documents([new_doc])
-        else:
-            retriever.add_documents([new_doc])
+        await retriever.aadd_documents([new_doc])
     except ValueError as ve:
         raise HTTPException(status_code=500, detail=f"Retriever Error: {str(ve)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected Error: {str(e)}")
 
+    await asyncio.to_thread(_bump_corpus_version)
     return {"status": "success", "message": "Document added"}
 
 @app.put("/admin/documents/{doc_id}", dependencies=[Depends(get_admin_user)])
 async def update_document(doc_id: str, doc: AdminDocument, process: bool = False):
+    retriever = await asyncio.to_thread(get_retriever)
     if not retriever:
         raise HTTPException(status_code=500, detail="Retriever not initialized")
         
     store = retriever.docstore
-    existing = store.mget([doc_id])[0]
+    existing = (await store.amget([doc_id]))[0]
     if not existing:
          raise HTTPException(status_code=404, detail="Document not found")
          
@@ -470,7 +463,7 @@ async def update_document(doc_id: str, doc: AdminDocument, process: bool = False
     }
 
     if process:
-        processed = rag_processor.process_document(doc.content, doc.source_url)
+        processed = await asyncio.to_thread(rag_processor.process_document, doc.content, doc.source_url)
         if processed:
             final_content = processed["content"]
             final_metadata.update(processed["metadata"])
@@ -484,48 +477,54 @@ async def update_document(doc_id: str, doc: AdminDocument, process: bool = False
     )
     
     try:
-        id_key = getattr(retriever, "id_key", "doc_id")
-        retriever.vectorstore.delete(where={id_key: doc_id})
+        await retriever.adelete_parents([doc_id])
     except Exception as e:
         print(f"Warning: Failed to cleanup vectorstore chunks for {doc_id}: {e}")
 
-    store.mdelete([doc_id]) 
+    await store.amdelete([doc_id])
     
-    retriever.add_documents([new_doc], ids=[doc_id])
+    await retriever.aadd_documents([new_doc], ids=[doc_id])
+    await asyncio.to_thread(_bump_corpus_version)
     
     return {"status": "success", "message": "Document updated"}
 
 @app.delete("/admin/documents/all", dependencies=[Depends(get_admin_user)])
 async def delete_all_documents():
+    retriever = await asyncio.to_thread(get_retriever)
     if not retriever:
         raise HTTPException(status_code=500, detail="Retriever not initialized")
     
     try:
         try:
-            with psycopg2.connect(POSTGRES_CONNECTION_STRING) as conn:
-                with conn.cursor() as cur:
-                    cur.execute("TRUNCATE TABLE public.doc_store")
-                    print("DEBUG: Truncated public.doc_store")
-                conn.commit()
+            await (await asyncio.to_thread(get_byte_store)).atruncate()
+            print("DEBUG: Truncated public.doc_store")
         except Exception as pg_e:
             print(f"Postgres Delete Error: {pg_e}")
             raise HTTPException(status_code=500, detail=f"Postgres cleanup failed: {pg_e}")
 
         try:
             print("DEBUG: Attempting to wipe Chroma...")
-            existing_ids = retriever.vectorstore.get()["ids"]
+            existing_ids = (await asyncio.to_thread(retriever.vectorstore.get))["ids"]
             
             if existing_ids:
                 batch_size = 40000 
                 for i in range(0, len(existing_ids), batch_size):
                     batch = existing_ids[i:i + batch_size]
-                    retriever.vectorstore.delete(batch)
+                    await asyncio.to_thread(retriever.vectorstore.delete, batch)
                 print(f"DEBUG: Deleted {len(existing_ids)} embeddings from Chroma.")
             else:
                 print("DEBUG: Chroma was already empty.")
 
         except Exception as chroma_e:
             print(f"Warning: Failed to cleanup vectorstore: {chroma_e}")
+
+        try:
+            lexical_index = await asyncio.to_thread(get_lexical_index)
+            await asyncio.to_thread(lexical_index.clear)
+        except Exception as lexical_e:
+            print(f"Warning: Failed to clear lexical index: {lexical_e}")
+
+        await asyncio.to_thread(_bump_corpus_version)
         
         return {"status": "success", "message": "All documents deleted from Postgres and Chroma."}
 
@@ -537,18 +536,19 @@ async def delete_all_documents():
 
 @app.delete("/admin/documents/{doc_id}", dependencies=[Depends(get_admin_user)])
 async def delete_document(doc_id: str):
+    retriever = await asyncio.to_thread(get_retriever)
     if not retriever:
         raise HTTPException(status_code=500, detail="Retriever not initialized")
     
     store = retriever.docstore
     
     try:
-        id_key = getattr(retriever, "id_key", "doc_id")
-        retriever.vectorstore.delete(where={id_key: doc_id})
+        await retriever.adelete_parents([doc_id])
     except Exception as e:
         print(f"Warning: Failed to cleanup vectorstore chunks for {doc_id}: {e}")
 
-    store.mdelete([doc_id])
+    await store.amdelete([doc_id])
+    await asyncio.to_thread(_bump_corpus_version)
     
     return {"status": "success", "message": "Document deleted"}
 
@@ -557,6 +557,7 @@ class DeleteDocumentsRequest(BaseModel):
 
 @app.post("/admin/documents/delete", dependencies=[Depends(get_admin_user)])
 async def delete_documents(request: DeleteDocumentsRequest):
+    retriever = await asyncio.to_thread(get_retriever)
     if not retriever:
         raise HTTPException(status_code=500, detail="Retriever not initialized")
     
@@ -567,21 +568,49 @@ async def delete_documents(request: DeleteDocumentsRequest):
          return {"status": "success", "message": "No documents to delete"}
 
     try:
-        id_key = getattr(retriever, "id_key", "doc_id")
-        for doc_id in ids_to_delete:
-             retriever.vectorstore.delete(where={id_key: doc_id})
-             
+        await retriever.adelete_parents(ids_to_delete)
     except Exception as e:
         print(f"Warning: Failed to cleanup vectorstore chunks during bulk delete: {e}")
 
     try:
-        store.mdelete(ids_to_delete)
+        await store.amdelete(ids_to_delete)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Docstore delete failed: {e}")
+
+    await asyncio.to_thread(_bump_corpus_version)
     
     return {"status": "success", "message": f"Deleted {len(ids_to_delete)} documents"}
 
 
+@app.post("/admin/lexical-index/rebuild", dependencies=[Depends(get_admin_user)])
+async def rebuild_lexical_index():
+    retriever = await asyncio.to_thread(get_retriever)
+    if not retriever:
+        raise HTTPException(status_code=500, detail="Retriever not initialized")
+    lexical_index = await asyncio.to_thread(get_lexical_index)
+    added = await asyncio.to_thread(lexical_index.rebuild_from_vectorstore, retriever.vectorstore, retriever.id_key)
+    if added is None:
+        raise HTTPException(status_code=409, detail="A lexical index rebuild is already running")
+    await asyncio.to_thread(_bump_corpus_version)
+    return {"status": "success", "message": f"Indexed {added} chunks"}
+
+@app.get("/admin/stats", dependencies=[Depends(get_admin_user)])
+async def get_stats():
+    # peek() so asking for stats never blocks on, or triggers, loading a component.
+    def component_stats(name):
+        component = registry.peek(name)
+        return component.stats() if component is not None else None
+
+    return {
+        "docstore_cache": component_stats("byte_store"),
+        "embedding_cache": component_stats("embeddings"),
+        "search_cache": component_stats("search_cache"),
+        "batching": get_batching_stats(),
+        "speculative_search": get_speculative_search_stats(),
+        "groq_keys": key_pool_stats(),
+        "registry": registry.status()
+    }
+
 @app.post("/admin/crawl", dependencies=[Depends(get_admin_user)])
 async def trigger_crawl(request: CrawlRequest):
     import subprocess
@@ -608,24 +637,25 @@ async def get_redis_queue_status():
         queue_key = f"{spider_name}:requests"
         dupefilter_key = f"{spider_name}:dupefilter"
         start_urls_key = f"{spider_name}:start_urls"
+        redis_client = await asyncio.to_thread(get_async_redis_client)
         
-        queue_type = redis_client.type(queue_key)
+        queue_type = await redis_client.type(queue_key)
         queue_size = 0
         queued_urls = []
         
         raw_items = []
         
         if queue_type == b"zset":
-            queue_size = redis_client.zcard(queue_key)
-            raw_items = redis_client.zrange(queue_key, 0, 49)
+            queue_size = await redis_client.zcard(queue_key)
+            raw_items = await redis_client.zrange(queue_key, 0, 49)
             
         elif queue_type == b"list":
-            queue_size = redis_client.llen(queue_key)
-            raw_items = redis_client.lrange(queue_key, 0, 49)
+            queue_size = await redis_client.llen(queue_key)
+            raw_items = await redis_client.lrange(queue_key, 0, 49)
         
-        processed_count = redis_client.scard(dupefilter_key)
+        processed_count = await redis_client.scard(dupefilter_key)
         
-        scheduled_count = redis_client.llen(start_urls_key)
+        scheduled_count = await redis_client.llen(start_urls_key)
         
         for item in raw_items:
             try:
@@ -667,7 +697,8 @@ async def flush_redis_queue():
             f"{spider_name}:dupefilter",
             f"{spider_name}:start_urls"
         ]
-        redis_client.delete(*keys)
+        redis_client = await asyncio.to_thread(get_async_redis_client)
+        await redis_client.delete(*keys)
         return {"status": "success", "message": "Redis queue flushed"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to flush Redis: {e}")
@@ -680,8 +711,9 @@ async def add_url_to_queue(request: AddUrlRequest):
     try:
         spider_name = "nitt"
         start_urls_key = f"{spider_name}:start_urls"
+        redis_client = await asyncio.to_thread(get_async_redis_client)
         
-        redis_client.lpush(start_urls_key, request.url)
+        await redis_client.lpush(start_urls_key, request.url)
         
         return {"status": "success", "message": f"Added {request.url} to queue"}
     except Exception as e:
@@ -8,15 +8,20 @@ from scrapy.exceptions import DropItem
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_classic.storage import LocalFileStore
-from langchain_classic.retrievers.parent_document_retriever import ParentDocumentRetriever
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from langchain_groq import ChatGroq
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
         
 from postgres_store import PostgresByteStore
-from langchain_classic.storage import create_kv_docstore
+from docstore_codec import create_compact_docstore
+from lexical_index import LexicalIndex
+from hybrid_retriever import HybridParentDocumentRetriever
+from local_vector_index import LocalVectorIndex
+from embedding_cache import CachedEmbeddings
+from search_cache import bump_corpus_version
+from utils import RotatingGroqChat
+import redis
 from bs4 import BeautifulSoup
 import re
 
@@ -36,13 +41,14 @@ class SmartRagPipeline:
         text = re.sub(r'Copyright © \d+ National Institute of Technology', '', text)
         return text
 
-    def __init__(self, groq_api_keys, pg_conn_str, chroma_host, chroma_port):
+    def __init__(self, groq_api_keys, pg_conn_str, chroma_host, chroma_port, redis_host=None, redis_port=6379):
         self.groq_api_keys = groq_api_keys
-        self.current_key_idx = 0
         
         self.pg_conn_str = pg_conn_str
         self.chroma_host = chroma_host
         self.chroma_port = chroma_port
+        self.redis_host = redis_host
+        self.redis_port = redis_port
         
         self.buffer = [] 
         self.BUFFER_SIZE = 5 
@@ -55,20 +61,21 @@ class SmartRagPipeline:
             groq_api_keys=crawler.settings.get('GROQ_API_KEYS'),
             pg_conn_str=crawler.settings.get('POSTGRES_CONNECTION_STRING'),
             chroma_host=crawler.settings.get('CHROMA_HOST'),
-            chroma_port=crawler.settings.get('CHROMA_PORT')
+            chroma_port=crawler.settings.get('CHROMA_PORT'),
+            redis_host=crawler.settings.get('REDIS_HOST'),
+            redis_port=crawler.settings.getint('REDIS_PORT', 6379)
         )
 
     def _setup_llm(self):
-        """Helper to initialize the LLM with the currently selected key"""
-        current_key = self.groq_api_keys[self.current_key_idx]
-        masked_key = current_key[:4] + "..." + current_key[-4:]
-        logging.info(f"🔑 Initializing LLM with Key Index {self.current_key_idx} ({masked_key})")
+        """Helper to initialize the LLM over the shared Groq key pool"""
+        logging.info(f"🔑 Initializing LLM with {len(self.groq_api_keys)} keys")
         
-        self.llm = ChatGroq(
-            api_key=current_key, 
-            model_name="llama-3.1-8b-instant", 
-            temperature=0,
-            max_retries=0
+        # The pool's usage and cooldowns are shared through Redis, so the crawler and the API
+        # workers stop landing on the same exhausted key.
+        self.llm = RotatingGroqChat(
+            self.groq_api_keys,
+            model_name="llama-3.1-8b-instant",
+            temperature=0
         )
 
     def open_spider(self, spider):
@@ -77,28 +84,40 @@ class SmartRagPipeline:
         if not self.groq_api_keys or not isinstance(self.groq_api_keys, list):
             raise ValueError("⚠️ GROQ_API_KEYS must be a list in settings.py!")
 
-        self.embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-        
-        import chromadb
-        client = chromadb.HttpClient(host=self.chroma_host, port=self.chroma_port)
-        
-        self.vectorstore = Chroma(
-            client=client,
-            collection_name="nitt_data",
-            embedding_function=self.embeddings,
+        # Shares the API's Redis embedding cache, so unchanged chunks of a re-crawled page are not re-embedded.
+        self.redis_client = redis.Redis(host=self.redis_host, port=self.redis_port) if self.redis_host else None
+        self.embeddings = CachedEmbeddings(
+            HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"),
+            model_name="all-MiniLM-L6-v2",
+            redis_client=self.redis_client,
         )
+        
+        # Must match the API's VECTOR_BACKEND, otherwise crawled chunks land in an index it never reads.
+        if os.getenv("VECTOR_BACKEND", "chroma").lower() == "local":
+            self.vectorstore = LocalVectorIndex(self.embeddings)
+        else:
+            import chromadb
+            client = chromadb.HttpClient(host=self.chroma_host, port=self.chroma_port)
+            
+            self.vectorstore = Chroma(
+                client=client,
+                collection_name="nitt_data",
+                embedding_function=self.embeddings,
+            )
 
         fs_store = PostgresByteStore(connection_string=self.pg_conn_str, table_name="doc_store")
-        store = create_kv_docstore(fs_store)
+        store = create_compact_docstore(fs_store)
         
         child_splitter = RecursiveCharacterTextSplitter(chunk_size=256, chunk_overlap=32)
         parent_splitter = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=200)
 
-        self.retriever = ParentDocumentRetriever(
+        # Writes child chunks to the shared BM25 index as well, so the API can do hybrid retrieval.
+        self.retriever = HybridParentDocumentRetriever(
             vectorstore=self.vectorstore,
             docstore=store,
             child_splitter=child_splitter,
             parent_splitter=parent_splitter,
+            lexical_index=LexicalIndex(),
         )
 
         self._setup_llm()
@@ -106,6 +125,7 @@ class SmartRagPipeline:
     def close_spider(self, spider):
         if self.buffer:
             self.process_batch(self.buffer)
+        logging.info(f"Embedding cache: {self.embeddings.stats()}")
         logging.info("✅ RAG Pipeline: Ingestion complete.")
 
     def process_item(self, item, spider):
@@ -130,30 +150,13 @@ class SmartRagPipeline:
 
     def _call_llm_safe(self, prompt):
         """
-        Executes LLM call with Automatic Key Rotation on 429 Errors.
+        Executes LLM call on the least-loaded key; the pool handles 429 cooldowns and retries.
         """
-        max_attempts = len(self.groq_api_keys) * 2 
-        
-        for attempt in range(max_attempts):
-            try:
-                return self.llm.invoke(prompt)
-                
-            except Exception as e:
-                error_msg = str(e).lower()
-                
-                if "429" in error_msg or "rate_limit" in error_msg or "too many requests" in error_msg:
-                    logging.warning(f"⚠️ Rate Limit hit on Key #{self.current_key_idx}. Rotating...")
-                    
-                    self.current_key_idx = (self.current_key_idx + 1) % len(self.groq_api_keys)
-                    
-                    self._setup_llm()
-                    
-                    continue
-                else:
-                    logging.error(f"❌ LLM Error (Non-RateLimit): {e}")
-                    raise e
-        
-        raise Exception("❌ ALL API keys are currently rate-limited or exhausted.")
+        try:
+            return self.llm.invoke(prompt)
+        except Exception as e:
+            logging.error(f"❌ LLM Error: {e}")
+            raise
 
     def process_batch(self, items):
         logging.info(f"⚡ RAG Pipeline: Auditing batch of {len(items)} items...")
@@ -202,6 +205,9 @@ class SmartRagPipeline:
             if cleaned_docs_to_index:
                 self.retriever.add_documents(cleaned_docs_to_index)
                 logging.info(f"💾 Indexed {len(cleaned_docs_to_index)} documents.")
+                # Cached search results no longer reflect the corpus.
+                if self.redis_client is not None:
+                    bump_corpus_version(self.redis_client)
 
         except Exception as e:
             logging.error(f"❌ Batch Processing Failed: {e}")
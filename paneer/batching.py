@@ -0,0 +1,138 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, List, Sequence, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class MicroBatcher:
+    """Collects work from concurrent callers into one call of a batched function.
+
+    Each caller submits a list of items and blocks until its own results are back. A background
+    thread waits up to max_wait_ms after the first pending request, or until max_batch items
+    are queued, then runs fn once over everything collected and splits the results.
+    """
+
+    def __init__(self, fn: Callable[[list], Sequence], max_batch: int = 64, max_wait_ms: float = 5, name: str = "batcher") -> None:
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+
+        self._pending: Deque[Tuple[list, Future, float]] = deque()
+        self._pending_items = 0
+        self._cond = threading.Condition()
+
+        self.batches = 0
+        self.items = 0
+        self.max_queue_depth = 0
+        self._wait_total = 0.0
+
+        threading.Thread(target=self._run, name=f"microbatch-{name}", daemon=True).start()
+
+    def submit(self, items: list) -> list:
+        if not items:
+            return []
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((items, future, time.monotonic()))
+            self._pending_items += len(items)
+            self.max_queue_depth = max(self.max_queue_depth, self._pending_items)
+            self._cond.notify()
+        return future.result()
+
+    def _take_batch(self) -> List[Tuple[list, Future, float]]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            deadline = self._pending[0][2] + self.max_wait
+            while self._pending_items < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            # Whole requests only; one request larger than max_batch still runs on its own.
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch):
+                request = self._pending.popleft()
+                batch.append(request)
+                size += len(request[0])
+            self._pending_items -= size
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            started = time.monotonic()
+            items = [item for request, _, _ in batch for item in request]
+            try:
+                results = self.fn(items)
+            except Exception as e:
+                logging.warning(f"Micro-batch {self.name} failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for request, future, submitted in batch:
+                future.set_result(list(results[offset:offset + len(request)]))
+                offset += len(request)
+                self._wait_total += started - submitted
+            self.batches += 1
+            self.items += len(items)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queue_depth": self._pending_items,
+                "pending_requests": len(self._pending),
+                "max_queue_depth": self.max_queue_depth,
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+                "avg_wait_ms": 1000 * self._wait_total / self.batches if self.batches else 0.0,
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+class BatchedEmbeddings(Embeddings):
+    """Routes embed_query calls from concurrent requests through one batched embed_documents call."""
+
+    def __init__(self, underlying: Embeddings, max_batch: int = 64, max_wait_ms: float = 5) -> None:
+        self.underlying = underlying
+        self.batcher = MicroBatcher(underlying.embed_documents, max_batch=max_batch, max_wait_ms=max_wait_ms, name="embed_query")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Ingestion batches are already large; send them straight through.
+        return self.underlying.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.batcher.submit([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        # Several queries of one request join the same batch as other requests' single queries.
+        return self.batcher.submit(list(texts))
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """Embeds search queries, through the batched and cached query path when the model offers one."""
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    return [embeddings.embed_query(text) for text in texts]
+
+
+class BatchedReranker:
+    """Scores (query, passage) pairs from concurrent searches in one cross-encoder pass."""
+
+    def __init__(self, underlying, max_batch: int = 128, max_wait_ms: float = 5) -> None:
+        self.underlying = underlying
+        self.backend = getattr(underlying, "backend", None)
+        self.batcher = MicroBatcher(underlying.predict, max_batch=max_batch, max_wait_ms=max_wait_ms, name="rerank")
+
+    def predict(self, pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+        return np.asarray(self.batcher.submit(list(pairs)), dtype=np.float32)
@@ -0,0 +1,144 @@
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
+
+# Parents are split with a 200 character overlap; shorter matches are treated as coincidence.
+MIN_OVERLAP = 40
+# Table rows and lists often have no sentence punctuation; long runs are cut at whitespace.
+MAX_SENTENCE_CHARS = 400
+NEAR_DUPLICATE_JACCARD = 0.85
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _join_overlapping(a: str, b: str) -> Optional[str]:
+    """Joins two parents of the same page when one continues where the other ends."""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    for first, second in ((a, b), (b, a)):
+        probe = second[:MIN_OVERLAP]
+        start = first.find(probe)
+        while start != -1:
+            if second.startswith(first[start:]):
+                return first + second[len(first) - start:]
+            start = first.find(probe, start + 1)
+    return None
+
+
+def _sentences(text: str) -> List[Tuple[int, int]]:
+    spans = []
+    start = 0
+    for match in list(_SENTENCE_END_RE.finditer(text)) + [None]:
+        end = match.start() if match else len(text)
+        while end - start > MAX_SENTENCE_CHARS:
+            cut = text.rfind(" ", start, start + MAX_SENTENCE_CHARS)
+            cut = cut if cut > start else start + MAX_SENTENCE_CHARS
+            spans.append((start, cut))
+            start = cut
+        if text[start:end].strip():
+            spans.append((start, end))
+        if match:
+            start = match.end()
+    return spans
+
+
+class _Section:
+    def __init__(self, text: str, score: float, rank: int, passages: List[str]) -> None:
+        self.text = text
+        self.score = score
+        self.rank = rank
+        self.passages = passages
+
+
+def _merge_sections(scored_docs: Sequence[Tuple[Document, float]]) -> Dict[str, List[_Section]]:
+    by_source: Dict[str, List[_Section]] = {}
+    for rank, (doc, score) in enumerate(scored_docs):
+        source = doc.metadata.get("source_url", "Unknown Source")
+        passage = doc.metadata.get("best_passage")
+        sections = by_source.setdefault(source, [])
+        section = _Section(doc.page_content, score, rank, [passage] if passage else [])
+        # Merging can make a section overlap another one, so keep folding until nothing joins.
+        merged = True
+        while merged:
+            merged = False
+            for other in sections:
+                joined = _join_overlapping(other.text, section.text)
+                if joined is not None:
+                    sections.remove(other)
+                    section = _Section(joined, max(score, other.score), min(rank, other.rank), other.passages + section.passages)
+                    merged = True
+                    break
+        sections.append(section)
+    return by_source
+
+
+def _word_set(text: str) -> frozenset:
+    return frozenset(word.lower() for word in _WORD_RE.findall(text))
+
+
+def pack_context(
+    scored_docs: Sequence[Tuple[Document, float]],
+    count_tokens: Callable[[str], int],
+    token_budget: int = 1500,
+) -> str:
+    """Builds the search tool's answer from reranked parents within a token budget.
+
+    Overlapping parents from the same page are merged and near-duplicate sentences dropped.
+    Sentences are then taken around each parent's best passage, best parent first, widening one
+    sentence at a time until the budget is spent. The output has one block per source URL.
+    """
+    by_source = _merge_sections(scored_docs)
+    sections = sorted((s for group in by_source.values() for s in group), key=lambda s: s.rank)
+
+    candidates = []
+    for section in sections:
+        spans = _sentences(section.text)
+        anchors = []
+        for passage in section.passages:
+            start = section.text.find(passage)
+            if start != -1:
+                anchors.extend(i for i, (s, e) in enumerate(spans) if s < start + len(passage) and e > start)
+        if not anchors:
+            anchors = [0]
+        for i, (start, end) in enumerate(spans):
+            distance = min(abs(i - anchor) for anchor in anchors)
+            candidates.append((distance, section.rank, i, section, section.text[start:end].replace("\n", " ").strip()))
+    candidates.sort(key=lambda c: (c[0], c[1], c[2]))
+
+    seen_exact = set()
+    seen_words: List[frozenset] = []
+    chosen: Dict[int, List[Tuple[int, str]]] = {}
+    remaining = token_budget
+    for _, _, index, section, sentence in candidates:
+        key = " ".join(_WORD_RE.findall(sentence.lower()))
+        if not key or key in seen_exact:
+            continue
+        words = _word_set(sentence)
+        if len(words) >= 5 and any(len(words & other) / len(words | other) >= NEAR_DUPLICATE_JACCARD for other in seen_words):
+            continue
+        cost = count_tokens(sentence) + 1
+        if cost > remaining:
+            continue
+        remaining -= cost
+        seen_exact.add(key)
+        if len(words) >= 5:
+            seen_words.append(words)
+        chosen.setdefault(id(section), []).append((index, sentence))
+
+    blocks = []
+    for source, group in sorted(by_source.items(), key=lambda item: min(s.rank for s in item[1])):
+        parts = []
+        for section in sorted(group, key=lambda s: s.rank):
+            picked = sorted(chosen.get(id(section), []))
+            if not picked:
+                continue
+            text = picked[0][1]
+            for (previous, _), (index, sentence) in zip(picked, picked[1:]):
+                text += (" " if index == previous + 1 else " ... ") + sentence
+            parts.append(text)
+        if parts:
+            blocks.append(f"Content: {' ... '.join(parts)}\nSource: {source}")
+    return "\n\n".join(blocks)
@@ -0,0 +1,198 @@
+import json
+import time
+import asyncio
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.stores import ByteStore
+
+# Rough per-entry bookkeeping cost, so many tiny values still count against the byte budget.
+ENTRY_OVERHEAD_BYTES = 100
+INVALIDATE_ALL = "*"
+
+
+class CachedByteStore(ByteStore):
+    """Read-through LRU cache in front of another ByteStore, bounded by total value size.
+
+    Writes and deletes invalidate the local cache and, when a Redis client is given, are broadcast
+    on a pub/sub channel so every other worker drops the same keys.
+    """
+
+    def __init__(
+        self,
+        store: ByteStore,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 300,
+        redis_client=None,
+        channel: str = "docstore:invalidate",
+    ) -> None:
+        self.store = store
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis_client
+        self.channel = channel
+
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._size = 0
+        # Bumped on every invalidation; a read that raced with a write must not repopulate stale data.
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._origin = uuid.uuid4().hex
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.redis_client is not None:
+            threading.Thread(target=self._listen, name="docstore-cache-invalidation", daemon=True).start()
+
+    def _entry_size(self, key: str, value: bytes) -> int:
+        return len(key) + len(value) + ENTRY_OVERHEAD_BYTES
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= self._entry_size(key, entry[0])
+
+    def _put(self, key: str, value: bytes, expires_at: float) -> None:
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        self._pop(key)
+        self._entries[key] = (value, expires_at)
+        self._size += size
+        while self._size > self.max_bytes:
+            old_key, (old_value, _) = self._entries.popitem(last=False)
+            self._size -= self._entry_size(old_key, old_value)
+            self.evictions += 1
+
+    def _invalidate_local(self, keys: Optional[Sequence[str]]) -> None:
+        with self._lock:
+            self._generation += 1
+            if keys is None:
+                self._entries.clear()
+                self._size = 0
+            else:
+                for key in keys:
+                    self._pop(key)
+
+    def _publish(self, keys: Optional[Sequence[str]]) -> None:
+        if self.redis_client is None:
+            return
+        message = {"origin": self._origin, "keys": INVALIDATE_ALL if keys is None else list(keys)}
+        try:
+            self.redis_client.publish(self.channel, json.dumps(message))
+        except Exception as e:
+            logging.warning(f"Docstore cache: failed to publish invalidation: {e}")
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    data = json.loads(message["data"])
+                    if data.get("origin") == self._origin:
+                        continue
+                    keys = data.get("keys")
+                    self._invalidate_local(None if keys == INVALIDATE_ALL else keys)
+            except Exception as e:
+                # Anything published while disconnected is lost, so drop everything before resubscribing.
+                logging.warning(f"Docstore cache: invalidation listener error: {e}")
+                self._invalidate_local(None)
+                time.sleep(1)
+
+    def invalidate(self, keys: Optional[Sequence[str]] = None) -> None:
+        self._invalidate_local(keys)
+        self._publish(keys)
+
+    async def ainvalidate(self, keys: Optional[Sequence[str]] = None) -> None:
+        self._invalidate_local(keys)
+        if self.redis_client is not None:
+            await asyncio.to_thread(self._publish, keys)
+
+    def _lookup(self, keys: Sequence[str]) -> Tuple[Dict[str, Optional[bytes]], List[str], int]:
+        now = time.monotonic()
+        results: Dict[str, Optional[bytes]] = {}
+        missing = []
+
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    results[key] = entry[0]
+                    self.hits += 1
+                else:
+                    if entry is not None:
+                        self._pop(key)
+                    missing.append(key)
+                    self.misses += 1
+            return results, missing, self._generation
+
+    def _fill(self, results: Dict[str, Optional[bytes]], missing: List[str], fetched: List[Optional[bytes]], generation: int) -> None:
+        with self._lock:
+            cacheable = self._generation == generation
+            expires_at = time.monotonic() + self.ttl_seconds
+            for key, value in zip(missing, fetched):
+                results[key] = value
+                if cacheable and value is not None:
+                    self._put(key, value, expires_at)
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        results, missing, generation = self._lookup(keys)
+        if missing:
+            self._fill(results, missing, self.store.mget(missing), generation)
+        return [results.get(key) for key in keys]
+
+    async def amget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        results, missing, generation = self._lookup(keys)
+        if missing:
+            self._fill(results, missing, await self.store.amget(missing), generation)
+        return [results.get(key) for key in keys]
+
+    def mset(self, key_value_pairs: Sequence[Tuple[str, bytes]]) -> None:
+        self.store.mset(key_value_pairs)
+        self.invalidate([k for k, _ in key_value_pairs])
+
+    async def amset(self, key_value_pairs: Sequence[Tuple[str, bytes]]) -> None:
+        await self.store.amset(key_value_pairs)
+        await self.ainvalidate([k for k, _ in key_value_pairs])
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        self.store.mdelete(keys)
+        self.invalidate(keys)
+
+    async def amdelete(self, keys: Sequence[str]) -> None:
+        await self.store.amdelete(keys)
+        await self.ainvalidate(keys)
+
+    def truncate(self) -> None:
+        self.store.truncate()
+        self.invalidate(None)
+
+    async def atruncate(self) -> None:
+        await self.store.atruncate()
+        await self.ainvalidate(None)
+
+    def yield_keys(self, prefix: Optional[str] = None) -> Iterator[str]:
+        return self.store.yield_keys(prefix=prefix)
+
+    async def ayield_keys(self, prefix: Optional[str] = None) -> AsyncIterator[str]:
+        async for key in self.store.ayield_keys(prefix=prefix):
+            yield key
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,130 @@
+import json
+import uuid
+import datetime
+import threading
+import ormsgpack
+import zstandard
+from typing import Any, Dict, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_core.load import dumps, loads
+from langchain_core.stores import BaseStore, ByteStore
+from langchain_classic.storage.encoder_backed import EncoderBackedStore
+
+# Encoded values start with MAGIC + version byte + flags byte. Rows written by create_kv_docstore are
+# LangChain JSON and always start with "{", so the two formats can never be confused.
+MAGIC = b"\xd0\xc5"
+VERSION = 1
+FLAG_ZSTD = 0x01
+HEADER_SIZE = len(MAGIC) + 2
+
+COMPRESSION_LEVEL = 3
+# Compressing tiny values costs more than it saves.
+MIN_COMPRESS_SIZE = 256
+
+# Without these, ormsgpack silently turns datetimes, UUIDs, tuples, enums, dataclasses and str/int
+# subclasses into plain values. Passed through, they reach _pack_default, which keeps the types
+# it can restore exactly and raises for the rest so encode_document falls back to the legacy format.
+PACK_OPTIONS = (
+    ormsgpack.OPT_PASSTHROUGH_DATETIME
+    | ormsgpack.OPT_PASSTHROUGH_UUID
+    | ormsgpack.OPT_PASSTHROUGH_TUPLE
+    | ormsgpack.OPT_PASSTHROUGH_ENUM
+    | ormsgpack.OPT_PASSTHROUGH_DATACLASS
+    | ormsgpack.OPT_PASSTHROUGH_SUBCLASS
+)
+EXT_DATETIME = 1
+EXT_DATE = 2
+EXT_UUID = 3
+
+_local = threading.local()
+
+
+def _compressor() -> zstandard.ZstdCompressor:
+    # zstandard (de)compressor objects must not be shared between threads.
+    if not hasattr(_local, "compressor"):
+        _local.compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+    return _local.compressor
+
+
+def _decompressor() -> zstandard.ZstdDecompressor:
+    if not hasattr(_local, "decompressor"):
+        _local.decompressor = zstandard.ZstdDecompressor()
+    return _local.decompressor
+
+
+def _pack_default(obj: Any) -> ormsgpack.Ext:
+    # Exact types only: subclasses such as pandas.Timestamp would not come back as themselves,
+    # and named time zones would come back as bare offsets.
+    if type(obj) is datetime.datetime and (obj.tzinfo is None or type(obj.tzinfo) is datetime.timezone):
+        return ormsgpack.Ext(EXT_DATETIME, obj.isoformat().encode())
+    if type(obj) is datetime.date:
+        return ormsgpack.Ext(EXT_DATE, obj.isoformat().encode())
+    if type(obj) is uuid.UUID:
+        return ormsgpack.Ext(EXT_UUID, obj.bytes)
+    raise TypeError(f"Type is not msgpack serializable: {type(obj).__name__}")
+
+
+def _unpack_ext(tag: int, data: bytes) -> Any:
+    if tag == EXT_DATETIME:
+        return datetime.datetime.fromisoformat(data.decode())
+    if tag == EXT_DATE:
+        return datetime.date.fromisoformat(data.decode())
+    if tag == EXT_UUID:
+        return uuid.UUID(bytes=data)
+    raise ValueError(f"Unknown docstore extension type: {tag}")
+
+
+def is_compact(data: bytes) -> bool:
+    return data[:len(MAGIC)] == MAGIC
+
+
+def encode_document(doc: Document) -> bytes:
+    if not isinstance(doc, Document):
+        raise TypeError("Expected a Document instance")
+    try:
+        payload = ormsgpack.packb([doc.page_content, doc.metadata, doc.id], default=_pack_default, option=PACK_OPTIONS)
+    except TypeError:
+        # Metadata msgpack cannot represent; fall back to the legacy format, which decode still reads.
+        return dumps(doc).encode("utf-8")
+
+    flags = 0
+    if len(payload) >= MIN_COMPRESS_SIZE:
+        compressed = _compressor().compress(payload)
+        if len(compressed) < len(payload):
+            payload = compressed
+            flags |= FLAG_ZSTD
+    return MAGIC + bytes([VERSION, flags]) + payload
+
+
+def decode_fields(data: bytes) -> Tuple[str, Dict[str, Any], Optional[str]]:
+    if is_compact(data):
+        version, flags = data[len(MAGIC)], data[len(MAGIC) + 1]
+        if version != VERSION:
+            raise ValueError(f"Unsupported docstore value version: {version}")
+        payload = data[HEADER_SIZE:]
+        if flags & FLAG_ZSTD:
+            payload = _decompressor().decompress(payload)
+        page_content, metadata, doc_id = ormsgpack.unpackb(payload, ext_hook=_unpack_ext)
+        return page_content, metadata or {}, doc_id
+
+    # Legacy row written by create_kv_docstore: {"lc": 1, "type": "constructor", "kwargs": {...}}
+    obj = json.loads(data)
+    kwargs = obj.get("kwargs", {}) if isinstance(obj, dict) else {}
+    if "page_content" not in kwargs:
+        doc = loads(data.decode("utf-8"))
+        return doc.page_content, doc.metadata, doc.id
+    return kwargs["page_content"], kwargs.get("metadata") or {}, kwargs.get("id")
+
+
+def decode_document(data: bytes) -> Document:
+    page_content, metadata, doc_id = decode_fields(data)
+    return Document(page_content=page_content, metadata=metadata, id=doc_id)
+
+
+def create_compact_docstore(store: ByteStore) -> BaseStore[str, Document]:
+    return EncoderBackedStore(
+        store,
+        lambda key: key,
+        encode_document,
+        decode_document,
+    )
@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that caches vectors by (model name, text hash).
+
+    Lookups go to an in-process LRU first, then to Redis when a client is given; only texts
+    missing from both are sent to the underlying model. Vectors are stored as float32 bytes so
+    the API and the crawler share one persistent cache.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        max_entries: int = 10000,
+        redis_client=None,
+        ttl_seconds: Optional[int] = 30 * 24 * 3600,
+        namespace: str = "emb",
+    ) -> None:
+        self.underlying = underlying
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+
+        # float32 arrays rather than lists of Python floats: roughly 8x less memory per vector.
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        digest = hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+        return f"{self.namespace}:{digest}"
+
+    def _get_local(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+        return found
+
+    def _put_local(self, items: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            for key, vector in items.items():
+                self._entries[key] = vector
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_redis(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if self.redis_client is None or not keys:
+            return {}
+        try:
+            values = self.redis_client.mget(keys)
+        except Exception as e:
+            logging.warning(f"Embedding cache: Redis lookup failed: {e}")
+            return {}
+        return {
+            key: np.frombuffer(value, dtype=np.float32)
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+
+    def _put_redis(self, items: Dict[str, np.ndarray]) -> None:
+        if self.redis_client is None or not items:
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, vector in items.items():
+                pipe.set(key, vector.tobytes(), ex=self.ttl_seconds)
+            pipe.execute()
+        except Exception as e:
+            logging.warning(f"Embedding cache: Redis write failed: {e}")
+
+    def _embed(self, texts: List[str], compute) -> List[List[float]]:
+        keys = [self._key(t) for t in texts]
+        unique = list(dict.fromkeys(keys))
+
+        local = self._get_local(unique)
+        found = dict(local)
+
+        remote = self._get_redis([k for k in unique if k not in found])
+        found.update(remote)
+
+        missing = [k for k in unique if k not in found]
+        if missing:
+            text_by_key = dict(zip(keys, texts))
+            vectors = compute([text_by_key[k] for k in missing])
+            computed = {k: np.asarray(v, dtype=np.float32) for k, v in zip(missing, vectors)}
+            found.update(computed)
+            self._put_redis(computed)
+
+        self._put_local({k: found[k] for k in unique if k not in local})
+        with self._lock:
+            self.memory_hits += len(local)
+            self.redis_hits += len(remote)
+            self.misses += len(missing)
+        return [found[k].tolist() for k in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, self.underlying.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], lambda t: [self.underlying.embed_query(t[0])])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        def compute(missing):
+            if hasattr(self.underlying, "embed_queries"):
+                return self.underlying.embed_queries(missing)
+            return [self.underlying.embed_query(text) for text in missing]
+
+        return self._embed(texts, compute)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.redis_hits + self.misses
+            return {
+                "model": self.model_name,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory_hits": self.memory_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.redis_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,118 @@
+import time
+import uuid
+import asyncio
+import argparse
+from collections import Counter
+from typing import Dict
+
+import orjson
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Stands in for the Groq API so key pool and hedging behaviour can be reproduced locally.
+# Point the Groq SDK at it with GROQ_API_BASE=http://127.0.0.1:<port>. Each API key gets a profile:
+# its time to first token, the delay between tokens, the reply text, or a 429.
+
+
+def _sse(payload: dict) -> bytes:
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+def create_app(profiles: Dict[str, dict], default_profile: dict = None) -> FastAPI:
+    default_profile = default_profile or {"ttft": 0.05, "inter_token": 0.005}
+    stats = {"requests": Counter(), "completed": Counter(), "cancelled": Counter()}
+    app = FastAPI()
+
+    @app.post("/openai/v1/chat/completions")
+    async def completions(request: Request):
+        key = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        body = await request.json()
+        profile = profiles.get(key, default_profile)
+        stats["requests"][key] += 1
+
+        if profile.get("rate_limited"):
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": "2"},
+                content={"error": {"message": "Rate limit reached. Please try again in 2s.", "type": "requests", "code": "rate_limit_exceeded"}},
+            )
+
+        words = profile.get("text", f"Reply from {key}.").split(" ")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        headers = {
+            "x-ratelimit-remaining-requests": "1000",
+            "x-ratelimit-remaining-tokens": "100000",
+            "x-ratelimit-reset-requests": "1s",
+            "x-ratelimit-reset-tokens": "1s",
+        }
+
+        def chunk(delta: dict, finish_reason=None) -> dict:
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason, "logprobs": None}],
+            }
+
+        if not body.get("stream"):
+            await asyncio.sleep(profile["ttft"])
+            stats["completed"][key] += 1
+            return JSONResponse(headers=headers, content={
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop", "logprobs": None}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": len(words), "total_tokens": 10 + len(words)},
+            })
+
+        async def events():
+            completed = False
+            try:
+                await asyncio.sleep(profile["ttft"])
+                for i, word in enumerate(words):
+                    delta = {"content": word if i == 0 else " " + word}
+                    if i == 0:
+                        delta["role"] = "assistant"
+                    yield _sse(chunk(delta))
+                    await asyncio.sleep(profile.get("inter_token", 0.005))
+                yield _sse(chunk({}, finish_reason="stop"))
+                yield b"data: [DONE]\n\n"
+                completed = True
+            finally:
+                # A client that hangs up mid-stream (a cancelled hedge) lands here without completing.
+                stats["completed" if completed else "cancelled"][key] += 1
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+    @app.get("/stats")
+    async def get_stats():
+        return {name: dict(counter) for name, counter in stats.items()}
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        for counter in stats.values():
+            counter.clear()
+        return {"status": "ok"}
+
+    return app
+
+
+def parse_profiles(specs):
+    # "slow=2.0" sets a 2s time to first token; "limited=429" always rate-limits.
+    profiles = {}
+    for spec in specs:
+        key, value = spec.split("=", 1)
+        profiles[key] = {"rate_limited": True} if value == "429" else {"ttft": float(value), "inter_token": 0.005}
+    return profiles
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Groq-compatible chat completions server.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--key", action="append", default=[], help="KEY=TTFT_SECONDS or KEY=429; repeatable.")
+    args = parser.parse_args()
+    uvicorn.run(create_app(parse_profiles(args.key)), host="127.0.0.1", port=args.port, log_level="warning")
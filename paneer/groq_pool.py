@@ -0,0 +1,506 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+# Groq counts limits per key and per model. These defaults are the free-tier limits; override
+# them for one model with GROQ_MODEL_LIMITS='{"<model>": {"requests_per_minute": 60, "tokens_per_minute": 30000}}'.
+GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", 30))
+GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", 6000))
+GROQ_MODEL_LIMITS = json.loads(os.getenv("GROQ_MODEL_LIMITS") or "{}")
+# Share bucket usage and cooldowns through Redis, so API workers and the crawler see each other's load.
+GROQ_POOL_SHARED = os.getenv("GROQ_POOL_SHARED", "true").lower() == "true"
+GROQ_POOL_MAX_WAIT_SECONDS = float(os.getenv("GROQ_POOL_MAX_WAIT_SECONDS", 30))
+# Hedged streaming: when the first chunk is later than this percentile of the key's recent
+# time-to-first-token, the same request is also sent on another key and the slower one is dropped.
+GROQ_HEDGE_ENABLED = os.getenv("GROQ_HEDGE_ENABLED", "false").lower() == "true"
+GROQ_HEDGE_PERCENTILE = float(os.getenv("GROQ_HEDGE_PERCENTILE", 90))
+GROQ_HEDGE_DEFAULT_DELAY_MS = float(os.getenv("GROQ_HEDGE_DEFAULT_DELAY_MS", 1500))
+GROQ_HEDGE_MIN_DELAY_MS = float(os.getenv("GROQ_HEDGE_MIN_DELAY_MS", 250))
+GROQ_HEDGE_MAX_DELAY_MS = float(os.getenv("GROQ_HEDGE_MAX_DELAY_MS", 5000))
+# Below this many samples a key borrows the pool-wide histogram.
+GROQ_HEDGE_MIN_SAMPLES = int(os.getenv("GROQ_HEDGE_MIN_SAMPLES", 20))
+
+DEFAULT_COOLDOWN_SECONDS = 10.0
+# Completion tokens are not known up front; budget this many per request.
+EXPECTED_COMPLETION_TOKENS = 256
+WINDOW_SECONDS = 60.0
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_TRY_AGAIN_RE = re.compile(r"try again in ((?:\d+(?:\.\d+)?(?:ms|h|m|s))+)", re.IGNORECASE)
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parses Groq's reset durations ("7.66s", "2m59.56s", "120ms") and plain seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    if getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error).lower()
+    return "429" in message or "rate_limit" in message or "too many requests" in message
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    seconds = parse_duration(headers.get("retry-after"))
+    if seconds is None:
+        match = _TRY_AGAIN_RE.search(str(error))
+        seconds = parse_duration(match.group(1)) if match else None
+    return seconds
+
+
+def estimate_tokens(input: Any) -> int:
+    # About four characters per token; only used to keep the token buckets honest.
+    if isinstance(input, str):
+        text_length = len(input)
+    elif isinstance(input, Sequence):
+        text_length = sum(len(str(getattr(message, "content", message))) for message in input)
+    else:
+        text_length = len(str(input))
+    return text_length // 4 + EXPECTED_COMPLETION_TOKENS
+
+
+class AllKeysRateLimited(Exception):
+    pass
+
+
+class RequestTooLarge(Exception):
+    """The request needs more tokens than one key may spend in a minute, so it can never be admitted."""
+
+
+def model_limits(model_name: str) -> Tuple[int, int]:
+    limits = GROQ_MODEL_LIMITS.get(model_name, {})
+    return (
+        int(limits.get("requests_per_minute", GROQ_REQUESTS_PER_MINUTE)),
+        int(limits.get("tokens_per_minute", GROQ_TOKENS_PER_MINUTE)),
+    )
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (50ms to about a minute) that halves its counts as it fills,
+    so percentiles follow recent behaviour rather than the whole day."""
+
+    BOUNDS = [0.05 * 1.2 ** i for i in range(40)]
+
+    def __init__(self, max_samples: int = 500) -> None:
+        self.max_samples = max_samples
+        self.counts = [0.0] * (len(self.BOUNDS) + 1)
+        self.total = 0.0
+
+    def record(self, seconds: float) -> None:
+        if self.total >= self.max_samples:
+            self.counts = [count / 2 for count in self.counts]
+            self.total /= 2
+        bucket = next((i for i, bound in enumerate(self.BOUNDS) if seconds <= bound), len(self.BOUNDS))
+        self.counts[bucket] += 1
+        self.total += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.total:
+            return None
+        target = self.total * p / 100
+        cumulative = 0.0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return self.BOUNDS[min(i, len(self.BOUNDS) - 1)]
+        return self.BOUNDS[-1]
+
+
+class _KeyState:
+    def __init__(self, api_key: str) -> None:
+        self.api_key = api_key
+        self.fingerprint = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+        self.window: deque = deque()
+        self.window_tokens = 0
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.ttft = LatencyHistogram()
+        # Streams dropped after losing a hedge; their TTFT is unknown, only longer than the winner's.
+        self.ttft_censored = 0
+        self.models: Dict[float, Any] = {}
+
+
+class GroqKeyPool:
+    """One process-wide pool of Groq API keys for one model.
+
+    Groq's limits apply per key and model, so every model gets its own pool. Each key gets
+    cached clients and sliding one-minute request and token buckets. A key is put
+    on cooldown when it returns a 429, using Retry-After, or when the x-ratelimit-* headers of a
+    successful response say it is exhausted. acquire() picks the healthy key with the most
+    headroom, and waits when every key is busy. With a Redis client, usage and cooldowns are also
+    counted in Redis, so other processes using the same keys avoid them.
+    """
+
+    def __init__(
+        self,
+        api_keys: Sequence[str],
+        model_name: str = "llama-3.1-8b-instant",
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        redis_client=None,
+        max_wait_seconds: float = GROQ_POOL_MAX_WAIT_SECONDS,
+        namespace: str = "groq",
+    ) -> None:
+        self.keys = [_KeyState(key.strip()) for key in api_keys if key and key.strip()]
+        self.model_name = model_name
+        default_rpm, default_tpm = model_limits(model_name)
+        self.requests_per_minute = requests_per_minute or default_rpm
+        self.tokens_per_minute = tokens_per_minute or default_tpm
+        self.redis_client = redis_client
+        self.max_wait_seconds = max_wait_seconds
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+        self.ttft = LatencyHistogram()
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    # --- clients ----------------------------------------------------------------------------
+
+    def chat_model(self, index: int, temperature: float = 0):
+        """Returns the cached ChatGroq for this key; its HTTP clients report rate-limit headers back."""
+        state = self.keys[index]
+        with self._lock:
+            llm = state.models.get(temperature)
+            if llm is None:
+                from langchain_groq import ChatGroq
+
+                def observe(response):
+                    self.observe_headers(index, response.headers)
+
+                async def aobserve(response):
+                    await self.aobserve_headers(index, response.headers)
+
+                llm = ChatGroq(
+                    api_key=state.api_key,
+                    model_name=self.model_name,
+                    temperature=temperature,
+                    max_retries=0,
+                    http_client=httpx.Client(event_hooks={"response": [observe]}),
+                    http_async_client=httpx.AsyncClient(event_hooks={"response": [aobserve]}),
+                )
+                state.models[temperature] = llm
+            return llm
+
+    # --- shared state -----------------------------------------------------------------------
+
+    def _redis(self):
+        if self.redis_client is None or time.monotonic() < self._redis_down_until:
+            return None
+        return self.redis_client
+
+    def _redis_failed(self, error: Exception) -> None:
+        # Fall back to local buckets for a while rather than paying a timeout on every request.
+        logging.warning(f"Groq key pool: Redis unavailable ({error}), using local state for 30s.")
+        self._redis_down_until = time.monotonic() + 30
+
+    def _redis_key(self, state: _KeyState, field: str) -> str:
+        return f"{self.namespace}:{state.fingerprint}:{self.model_name}:{field}"
+
+    def _shared_usage(self, now: float) -> Optional[List[Tuple[int, int, float]]]:
+        client = self._redis()
+        if client is None:
+            return None
+        minute = int(time.time() // WINDOW_SECONDS)
+        try:
+            pipe = client.pipeline(transaction=False)
+            for state in self.keys:
+                pipe.hmget(self._redis_key(state, f"usage:{minute}"), "requests", "tokens")
+                pipe.pttl(self._redis_key(state, "cooldown"))
+            replies = pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+        usage = []
+        for (requests, tokens), cooldown_ms in zip(replies[0::2], replies[1::2]):
+            cooldown_until = now + cooldown_ms / 1000 if cooldown_ms and cooldown_ms > 0 else 0.0
+            usage.append((int(requests or 0), int(tokens or 0), cooldown_until))
+        return usage
+
+    def _shared_record(self, state: _KeyState, tokens: int) -> None:
+        client = self._redis()
+        if client is None:
+            return
+        key = self._redis_key(state, f"usage:{int(time.time() // WINDOW_SECONDS)}")
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.hincrby(key, "requests", 1)
+            pipe.hincrby(key, "tokens", tokens)
+            pipe.expire(key, int(WINDOW_SECONDS * 2))
+            pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+    def _shared_cooldown(self, state: _KeyState, seconds: float) -> None:
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            # Only ever extends a cooldown another process has already set.
+            key = self._redis_key(state, "cooldown")
+            milliseconds = max(1, int(seconds * 1000))
+            if client.pttl(key) < milliseconds:
+                client.set(key, b"1", px=milliseconds)
+        except Exception as e:
+            self._redis_failed(e)
+
+    # --- selection --------------------------------------------------------------------------
+
+    def _expire(self, state: _KeyState, now: float) -> None:
+        while state.window and state.window[0][0] <= now - WINDOW_SECONDS:
+            _, tokens = state.window.popleft()
+            state.window_tokens -= tokens
+
+    def _try_acquire(self, tokens: int, exclude: Sequence[int] = ()) -> Tuple[Optional[int], float]:
+        """Reserves capacity on the least-loaded key, or returns how long to wait before retrying."""
+        now = time.monotonic()
+        shared = self._shared_usage(now)
+        with self._lock:
+            best, best_load, wait = None, None, None
+            for index, state in enumerate(self.keys):
+                self._expire(state, now)
+                if index in exclude:
+                    continue
+                requests, used_tokens, cooldown_until = len(state.window), state.window_tokens, state.cooldown_until
+                if shared is not None:
+                    # Redis counts every process, this one included.
+                    requests = max(requests, shared[index][0])
+                    used_tokens = max(used_tokens, shared[index][1])
+                    cooldown_until = max(cooldown_until, shared[index][2])
+                if cooldown_until > now:
+                    ready_in = cooldown_until - now
+                elif requests >= self.requests_per_minute or used_tokens + tokens > self.tokens_per_minute:
+                    ready_in = state.window[0][0] + WINDOW_SECONDS - now if state.window else 1.0
+                else:
+                    load = max(requests / self.requests_per_minute, (used_tokens + tokens) / self.tokens_per_minute)
+                    load += state.in_flight / self.requests_per_minute
+                    if best_load is None or load < best_load:
+                        best, best_load = index, load
+                    continue
+                wait = ready_in if wait is None else min(wait, ready_in)
+            if best is None:
+                return None, max(wait or 1.0, 0.05)
+            state = self.keys[best]
+            state.window.append((now, tokens))
+            state.window_tokens += tokens
+            state.in_flight += 1
+            state.requests += 1
+        self._shared_record(state, tokens)
+        return best, 0.0
+
+    async def _off_loop(self, function, *args):
+        # Anything that may talk to Redis runs in a worker thread, so a slow Redis never stalls
+        # the event loop and every stream on it.
+        if self.redis_client is None:
+            return function(*args)
+        return await asyncio.to_thread(function, *args)
+
+    def _check_request(self, tokens: int) -> None:
+        if not self.keys:
+            raise ValueError("No Groq API keys provided.")
+        if tokens > self.tokens_per_minute:
+            raise RequestTooLarge(
+                f"Request needs about {tokens} tokens but {self.model_name} allows {self.tokens_per_minute} "
+                f"tokens per minute per key; shorten the prompt or raise the limit in GROQ_MODEL_LIMITS."
+            )
+
+    def acquire(self, tokens: int = EXPECTED_COMPLETION_TOKENS) -> int:
+        self._check_request(tokens)
+        deadline = time.monotonic() + self.max_wait_seconds
+        while True:
+            index, wait = self._try_acquire(tokens)
+            if index is not None:
+                return index
+            if time.monotonic() + wait > deadline:
+                raise AllKeysRateLimited("ALL API keys are currently rate-limited or exhausted.")
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = EXPECTED_COMPLETION_TOKENS) -> int:
+        self._check_request(tokens)
+        deadline = time.monotonic() + self.max_wait_seconds
+        while True:
+            index, wait = await self._off_loop(self._try_acquire, tokens)
+            if index is not None:
+                return index
+            if time.monotonic() + wait > deadline:
+                raise AllKeysRateLimited("ALL API keys are currently rate-limited or exhausted.")
+            await asyncio.sleep(wait)
+
+    def try_acquire(self, tokens: int = EXPECTED_COMPLETION_TOKENS, exclude: Sequence[int] = ()) -> Optional[int]:
+        """Like acquire(), but returns None at once instead of waiting for capacity."""
+        return self._try_acquire(tokens, exclude)[0]
+
+    async def atry_acquire(self, tokens: int = EXPECTED_COMPLETION_TOKENS, exclude: Sequence[int] = ()) -> Optional[int]:
+        return (await self._off_loop(self._try_acquire, tokens, exclude))[0]
+
+    def record_ttft(self, index: int, seconds: float) -> None:
+        with self._lock:
+            self.keys[index].ttft.record(seconds)
+            self.ttft.record(seconds)
+
+    def record_censored(self, index: int) -> None:
+        with self._lock:
+            self.keys[index].ttft_censored += 1
+
+    def hedge_delay(self, index: int) -> float:
+        """Seconds to wait for a first chunk from this key before hedging on another one."""
+        with self._lock:
+            histogram = self.keys[index].ttft
+            if histogram.total < GROQ_HEDGE_MIN_SAMPLES:
+                histogram = self.ttft
+            delay = histogram.percentile(GROQ_HEDGE_PERCENTILE) if histogram.total >= GROQ_HEDGE_MIN_SAMPLES else None
+        if delay is None:
+            delay = GROQ_HEDGE_DEFAULT_DELAY_MS / 1000
+        return min(max(delay, GROQ_HEDGE_MIN_DELAY_MS / 1000), GROQ_HEDGE_MAX_DELAY_MS / 1000)
+
+    def _release_local(self, index: int, error: Optional[Exception]) -> Optional[float]:
+        # Returns how long to cool the key down for, if the request hit a rate limit.
+        state = self.keys[index]
+        with self._lock:
+            state.in_flight -= 1
+            if error is None or not is_rate_limit_error(error):
+                return None
+            state.rate_limited += 1
+        seconds = retry_after(error) or DEFAULT_COOLDOWN_SECONDS
+        logging.warning(f"Rate Limit hit on Key #{index}. Cooling down for {seconds:.1f}s.")
+        return seconds
+
+    def release(self, index: int, error: Optional[Exception] = None) -> None:
+        seconds = self._release_local(index, error)
+        if seconds:
+            self.cooldown(index, seconds)
+
+    async def arelease(self, index: int, error: Optional[Exception] = None) -> None:
+        # The in-flight count drops before the first await, so a cancelled caller still releases the key.
+        seconds = self._release_local(index, error)
+        if seconds:
+            await self.acooldown(index, seconds)
+
+    def _cooldown_local(self, index: int, seconds: float) -> _KeyState:
+        state = self.keys[index]
+        with self._lock:
+            state.cooldown_until = max(state.cooldown_until, time.monotonic() + seconds)
+        return state
+
+    def cooldown(self, index: int, seconds: float) -> None:
+        self._shared_cooldown(self._cooldown_local(index, seconds), seconds)
+
+    async def acooldown(self, index: int, seconds: float) -> None:
+        await self._off_loop(self._shared_cooldown, self._cooldown_local(index, seconds), seconds)
+
+    def _header_cooldown(self, headers) -> Optional[float]:
+        # A key that has just run out is benched until its window resets instead of waiting for a 429.
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        seconds = None
+        if remaining_requests is not None and remaining_requests.isdigit() and int(remaining_requests) == 0:
+            seconds = parse_duration(headers.get("x-ratelimit-reset-requests"))
+        if remaining_tokens is not None and remaining_tokens.isdigit() and int(remaining_tokens) < EXPECTED_COMPLETION_TOKENS:
+            reset = parse_duration(headers.get("x-ratelimit-reset-tokens"))
+            if reset is not None:
+                seconds = max(seconds or 0.0, reset)
+        return seconds
+
+    def observe_headers(self, index: int, headers) -> None:
+        seconds = self._header_cooldown(headers)
+        if seconds:
+            self.cooldown(index, seconds)
+
+    async def aobserve_headers(self, index: int, headers) -> None:
+        seconds = self._header_cooldown(headers)
+        if seconds:
+            await self.acooldown(index, seconds)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            keys = []
+            for index, state in enumerate(self.keys):
+                self._expire(state, now)
+                keys.append({
+                    "key": index,
+                    "fingerprint": state.fingerprint,
+                    "requests_last_minute": len(state.window),
+                    "tokens_last_minute": state.window_tokens,
+                    "in_flight": state.in_flight,
+                    "cooldown_seconds": round(max(0.0, state.cooldown_until - now), 1),
+                    "requests": state.requests,
+                    "rate_limited": state.rate_limited,
+                    "ttft_p50": state.ttft.percentile(50),
+                    "ttft_p90": state.ttft.percentile(90),
+                    "ttft_censored": state.ttft_censored,
+                })
+            hedging = {"enabled": GROQ_HEDGE_ENABLED, "hedges": self.hedges, "hedge_wins": self.hedge_wins}
+        return {
+            "model": self.model_name,
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "shared": self.redis_client is not None,
+            "keys": keys,
+            "hedging": hedging,
+        }
+
+
+_pools: Dict[Tuple[str, Tuple[str, ...]], GroqKeyPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _shared_redis_client():
+    if not GROQ_POOL_SHARED:
+        return None
+    try:
+        import redis
+
+        return redis.Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", 6379)),
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5,
+        )
+    except Exception as e:
+        logging.warning(f"Groq key pool: not sharing state through Redis ({e}).")
+        return None
+
+
+def get_key_pool(api_keys: Sequence[str], model_name: str) -> GroqKeyPool:
+    """Returns the process-wide pool for this model and set of keys, creating it on first use."""
+    keys = tuple(key.strip() for key in api_keys if key and key.strip())
+    with _pools_lock:
+        pool = _pools.get((model_name, keys))
+        if pool is None:
+            pool = _pools[(model_name, keys)] = GroqKeyPool(keys, model_name=model_name, redis_client=_shared_redis_client())
+        return pool
+
+
+def key_pool_stats() -> List[dict]:
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
@@ -0,0 +1,270 @@
+import json
+import asyncio
+import logging
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_classic.retrievers.parent_document_retriever import ParentDocumentRetriever
+from batching import embed_queries
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[Sequence[Document]], k: int = 60, id_key: str = "doc_id"
+) -> List[Tuple[Document, float]]:
+    # Chunks are identified by (parent id, text) so the same chunk found by both retrievers is merged.
+    scores: Dict[tuple, float] = {}
+    docs: Dict[tuple, Document] = {}
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked):
+            key = (doc.metadata.get(id_key), doc.page_content)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            docs.setdefault(key, doc)
+    return [(docs[key], scores[key]) for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+# Filters applied as exact metadata matches; source_url_prefix is handled separately.
+EXACT_FILTER_FIELDS = ("audience", "topic", "content_type")
+
+
+def _variants(value: str) -> List[str]:
+    # audience/topic come from an LLM at ingestion time, so match common casings of the value.
+    value = value.strip()
+    return list(dict.fromkeys([value, value.lower(), value.title(), value.upper()]))
+
+
+def build_where(filters: Optional[Dict[str, Optional[str]]]) -> Optional[Dict[str, Any]]:
+    """Translates search filters into a Chroma `where` clause."""
+    clauses = [
+        {field: {"$in": _variants(filters[field])}}
+        for field in EXACT_FILTER_FIELDS
+        if filters and filters.get(field)
+    ]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+_chroma_multi_query = True
+
+
+def _chroma_query_by_vectors(vectorstore, vectors: Sequence[Sequence[float]], k: int, where: Optional[Dict[str, Any]]) -> List[List[Document]]:
+    # Chroma accepts several query embeddings in one request; the LangChain wrapper does not expose it.
+    response = vectorstore._collection.query(
+        query_embeddings=[list(vector) for vector in vectors], n_results=k, where=where, include=["documents", "metadatas"]
+    )
+    ids, texts, metadatas = response["ids"], response["documents"], response["metadatas"]
+    if not (len(ids) == len(texts) == len(metadatas) == len(vectors)):
+        raise ValueError(f"expected {len(vectors)} result lists, got {len(ids)}")
+    return [
+        [Document(id=doc_id, page_content=text, metadata=metadata or {}) for doc_id, text, metadata in zip(*lists)]
+        for lists in zip(ids, texts, metadatas)
+    ]
+
+
+def search_by_vectors(vectorstore, vectors: Sequence[Sequence[float]], k: int = 4, where: Optional[Dict[str, Any]] = None) -> List[List[Document]]:
+    """Dense search for several query vectors, in one vector store request where the store allows it."""
+    global _chroma_multi_query
+    if hasattr(vectorstore, "similarity_search_by_vectors"):
+        return vectorstore.similarity_search_by_vectors(vectors, k=k, filter=where)
+    if _chroma_multi_query and hasattr(vectorstore, "_collection"):
+        try:
+            return _chroma_query_by_vectors(vectorstore, vectors, k, where)
+        except (AttributeError, TypeError, KeyError, ValueError) as e:
+            # Private Chroma API; if its shape changes, fall back to the public per-vector call for good.
+            logging.warning(f"Hybrid retriever: batched Chroma query unavailable ({e!r}), querying one vector at a time.")
+            _chroma_multi_query = False
+    return [vectorstore.similarity_search_by_vector(vector, k=k, filter=where) for vector in vectors]
+
+
+def aggregate_parents(
+    scored_children: Sequence[Tuple[Document, float]], id_key: str = "doc_id", mode: str = "max"
+) -> List[Tuple[str, float, Document]]:
+    """Collapses child hits into (parent id, parent score, best child), best parent first.
+
+    "max" scores a parent by its best child; "sum" also rewards parents matched by many children.
+    """
+    parents: Dict[str, List] = {}
+    for child, score in scored_children:
+        parent_id = child.metadata.get(id_key)
+        if parent_id is None:
+            continue
+        entry = parents.get(parent_id)
+        if entry is None:
+            parents[parent_id] = [score, child, score]
+            continue
+        entry[0] = entry[0] + score if mode == "sum" else max(entry[0], score)
+        if score > entry[2]:
+            entry[1], entry[2] = child, score
+    ranked = sorted(parents.items(), key=lambda item: item[1][0], reverse=True)
+    return [(parent_id, score, child) for parent_id, (score, child, _) in ranked]
+
+
+class HybridParentDocumentRetriever(ParentDocumentRetriever):
+    """ParentDocumentRetriever that fuses dense child hits with BM25 child hits.
+
+    Child chunks are written to the lexical index alongside the vector store, and both result
+    lists are merged with reciprocal rank fusion. Fused child scores are aggregated per parent,
+    and each returned parent carries its best child in metadata["best_passage"] along with its
+    metadata["retrieval_score"], so a reranker can score the passage instead of the whole parent.
+    """
+
+    lexical_index: Any
+    lexical_k: int = 20
+    rrf_k: int = 60
+    max_parents: Optional[int] = None
+    parent_aggregation: Literal["max", "sum"] = "max"
+    # Chroma cannot match a metadata prefix, so URL-prefix searches over-fetch and filter afterwards.
+    prefix_overfetch: int = 4
+
+    def _rank_parents(self, dense: Sequence[Document], lexical: Sequence[Document]) -> List[Tuple[str, float, Document]]:
+        fused = reciprocal_rank_fusion([dense, lexical], k=self.rrf_k, id_key=self.id_key)
+        parents = aggregate_parents(fused, id_key=self.id_key, mode=self.parent_aggregation)
+        return parents[:self.max_parents] if self.max_parents else parents
+
+    def _attach(self, ranked: Sequence[Tuple[str, float, Document]], docs: Sequence[Optional[Document]]) -> List[Document]:
+        results = []
+        for (_, score, child), doc in zip(ranked, docs):
+            if doc is None:
+                continue
+            doc.metadata["best_passage"] = child.page_content
+            doc.metadata["retrieval_score"] = score
+            results.append(doc)
+        return results
+
+    def _dense_kwargs(self, filters: Optional[Dict[str, Optional[str]]]) -> Dict[str, Any]:
+        kwargs = dict(self.search_kwargs)
+        where = build_where(filters)
+        if where is not None:
+            kwargs["filter"] = where
+        if filters and filters.get("source_url_prefix"):
+            kwargs["k"] = kwargs.get("k", 4) * self.prefix_overfetch
+        return kwargs
+
+    def _filter_dense(self, dense: List[Document], filters: Optional[Dict[str, Optional[str]]]) -> List[Document]:
+        prefix = filters.get("source_url_prefix") if filters else None
+        if not prefix:
+            return dense
+        k = self.search_kwargs.get("k", 4)
+        return [doc for doc in dense if str(doc.metadata.get("source_url", "")).startswith(prefix)][:k]
+
+    def _lexical_search(self, query: str, filters: Optional[Dict[str, Optional[str]]]) -> List[Document]:
+        lexical_filters = {field: _variants(filters[field]) for field in EXACT_FILTER_FIELDS if filters and filters.get(field)}
+        prefix = filters.get("source_url_prefix") if filters else None
+        hits = self.lexical_index.search(query, self.lexical_k, filters=lexical_filters, source_url_prefix=prefix)
+        return [doc for doc, _ in hits]
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        filters: Optional[Dict[str, Optional[str]]] = None,
+    ) -> List[Document]:
+        dense = self._filter_dense(self.vectorstore.similarity_search(query, **self._dense_kwargs(filters)), filters)
+        lexical = self._lexical_search(query, filters)
+        ranked = self._rank_parents(dense, lexical)
+        return self._attach(ranked, self.docstore.mget([parent_id for parent_id, _, _ in ranked]))
+
+    async def _aget_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: AsyncCallbackManagerForRetrieverRun,
+        filters: Optional[Dict[str, Optional[str]]] = None,
+    ) -> List[Document]:
+        dense, lexical = await asyncio.gather(
+            self.vectorstore.asimilarity_search(query, **self._dense_kwargs(filters)),
+            asyncio.to_thread(self._lexical_search, query, filters),
+        )
+        dense = self._filter_dense(dense, filters)
+        ranked = self._rank_parents(dense, lexical)
+        return self._attach(ranked, await self.docstore.amget([parent_id for parent_id, _, _ in ranked]))
+
+    def _dense_search_many(
+        self, vectors: Sequence[Sequence[float]], filters: Sequence[Optional[Dict[str, Optional[str]]]]
+    ) -> List[List[Document]]:
+        # Queries with the same filter share one vector store request.
+        groups: Dict[str, List[int]] = {}
+        kwargs_by_group: Dict[str, Dict[str, Any]] = {}
+        for i, query_filters in enumerate(filters):
+            kwargs = self._dense_kwargs(query_filters)
+            group = json.dumps(kwargs, sort_keys=True)
+            groups.setdefault(group, []).append(i)
+            kwargs_by_group[group] = kwargs
+
+        results: List[List[Document]] = [[] for _ in vectors]
+        for group, indices in groups.items():
+            kwargs = kwargs_by_group[group]
+            found = search_by_vectors(self.vectorstore, [vectors[i] for i in indices], k=kwargs.get("k", 4), where=kwargs.get("filter"))
+            for i, docs in zip(indices, found):
+                results[i] = self._filter_dense(docs, filters[i])
+        return results
+
+    async def abatch_search(
+        self, queries: Sequence[str], filters: Optional[Sequence[Optional[Dict[str, Optional[str]]]]] = None
+    ) -> List[List[Document]]:
+        """Runs several searches at once, returning one result list per query in input order.
+
+        All queries are embedded together through the query embedding path and sent to the vector store together, and the
+        parents of every result list are fetched from the docstore in a single mget.
+        """
+        filters = list(filters) if filters is not None else [None] * len(queries)
+        if not queries:
+            return []
+        vectors = await asyncio.to_thread(embed_queries, self.vectorstore.embeddings, list(queries))
+        dense_lists, lexical_lists = await asyncio.gather(
+            asyncio.to_thread(self._dense_search_many, vectors, filters),
+            asyncio.gather(*(asyncio.to_thread(self._lexical_search, query, f) for query, f in zip(queries, filters))),
+        )
+        ranked_lists = [self._rank_parents(dense, lexical) for dense, lexical in zip(dense_lists, lexical_lists)]
+
+        parent_ids = list(dict.fromkeys(parent_id for ranked in ranked_lists for parent_id, _, _ in ranked))
+        parents = dict(zip(parent_ids, await self.docstore.amget(parent_ids))) if parent_ids else {}
+        results = []
+        for ranked in ranked_lists:
+            docs = [parents[parent_id] for parent_id, _, _ in ranked]
+            # Copies, so a parent found by two queries keeps each query's best_passage and score.
+            results.append(self._attach(ranked, [doc.model_copy(deep=True) if doc is not None else None for doc in docs]))
+        return results
+
+    def add_documents(
+        self,
+        documents: List[Document],
+        ids: Optional[List[str]] = None,
+        add_to_docstore: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        docs, full_docs = self._split_docs_for_adding(documents, ids, add_to_docstore=add_to_docstore)
+        self.vectorstore.add_documents(docs, **kwargs)
+        if ids:
+            # Re-adding a parent replaces its chunks instead of duplicating them.
+            self.lexical_index.delete_parents(ids)
+        self.lexical_index.add(docs, self.id_key)
+        if add_to_docstore:
+            self.docstore.mset(full_docs)
+
+    async def aadd_documents(
+        self,
+        documents: List[Document],
+        ids: Optional[List[str]] = None,
+        add_to_docstore: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        docs, full_docs = self._split_docs_for_adding(documents, ids, add_to_docstore=add_to_docstore)
+        await self.vectorstore.aadd_documents(docs, **kwargs)
+        if ids:
+            await asyncio.to_thread(self.lexical_index.delete_parents, ids)
+        await asyncio.to_thread(self.lexical_index.add, docs, self.id_key)
+        if add_to_docstore:
+            await self.docstore.amset(full_docs)
+
+    def delete_parents(self, ids: Sequence[str]) -> None:
+        # Removes the child chunks of the given parents from both indexes; the docstore is left to the caller.
+        for parent_id in ids:
+            self.vectorstore.delete(where={self.id_key: parent_id})
+        self.lexical_index.delete_parents(ids)
+
+    async def adelete_parents(self, ids: Sequence[str]) -> None:
+        for parent_id in ids:
+            await self.vectorstore.adelete(where={self.id_key: parent_id})
+        await asyncio.to_thread(self.lexical_index.delete_parents, ids)
@@ -0,0 +1,211 @@
+import os
+import re
+import json
+import fcntl
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
+
+LEXICAL_INDEX_PATH = os.getenv(
+    "LEXICAL_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "lexical_index.sqlite3")
+)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_FIELD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def to_match_query(query: str) -> Optional[str]:
+    # Quote every term so user punctuation can never be parsed as FTS5 syntax; OR keeps recall high
+    # and BM25 ranks documents matching more (and rarer) terms first.
+    terms = list(dict.fromkeys(t.lower() for t in _TOKEN_RE.findall(query)))
+    if not terms:
+        return None
+    return " OR ".join(f'"{t}"' for t in terms)
+
+
+def _vectorstore_batches(vectorstore: Any, batch_size: int) -> Iterator[Dict[str, Any]]:
+    # LocalVectorIndex walks a snapshot once; Chroma only offers offset paging.
+    iter_batches = getattr(vectorstore, "iter_batches", None)
+    if iter_batches is not None:
+        yield from iter_batches(batch_size, include=["documents", "metadatas"])
+        return
+    offset = 0
+    while True:
+        batch: Dict[str, Any] = vectorstore.get(limit=batch_size, offset=offset, include=["documents", "metadatas"])
+        if not batch.get("documents"):
+            return
+        yield batch
+        offset += len(batch["documents"])
+
+
+class LexicalIndex:
+    """BM25 index over child chunks, backed by an SQLite FTS5 table on local disk.
+
+    Chunks are keyed by their parent id so they can be replaced or removed together with the
+    parent, mirroring how the vector store is maintained.
+    """
+
+    def __init__(self, path: str = LEXICAL_INDEX_PATH) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._create_tables_if_not_exist()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            # WAL lets the API workers read while the crawler writes.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_tables_if_not_exist(self) -> None:
+        conn = self._connection()
+        with conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    id INTEGER PRIMARY KEY,
+                    parent_id TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS chunks_parent_id_idx ON chunks (parent_id);
+                CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+                    content, content='chunks', content_rowid='id', tokenize='porter unicode61'
+                );
+                CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+                    INSERT INTO chunks_fts (rowid, content) VALUES (new.id, new.content);
+                END;
+                CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+                    INSERT INTO chunks_fts (chunks_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                END;
+                """
+            )
+
+    def add(self, chunks: Sequence[Document], id_key: str = "doc_id") -> None:
+        rows = [
+            (chunk.metadata[id_key], chunk.page_content, json.dumps(chunk.metadata))
+            for chunk in chunks
+            if id_key in chunk.metadata
+        ]
+        if not rows:
+            return
+        conn = self._connection()
+        with conn:
+            conn.executemany("INSERT INTO chunks (parent_id, content, metadata) VALUES (?, ?, ?)", rows)
+
+    def delete_parents(self, parent_ids: Iterable[str]) -> None:
+        parent_ids = list(parent_ids)
+        if not parent_ids:
+            return
+        conn = self._connection()
+        with conn:
+            conn.executemany("DELETE FROM chunks WHERE parent_id = ?", [(p,) for p in parent_ids])
+
+    def clear(self) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM chunks")
+            conn.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('rebuild')")
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT count(*) FROM chunks").fetchone()[0]
+
+    def search(
+        self,
+        query: str,
+        k: int = 20,
+        filters: Optional[Dict[str, Sequence[str]]] = None,
+        source_url_prefix: Optional[str] = None,
+    ) -> List[Tuple[Document, float]]:
+        """BM25 search; filters maps a metadata field to the values it may take."""
+        match = to_match_query(query)
+        if not match:
+            return []
+        conditions = ["chunks_fts MATCH ?"]
+        params: List[Any] = [match]
+        for field, values in (filters or {}).items():
+            if not _FIELD_RE.fullmatch(field):
+                raise ValueError(f"Invalid metadata field: {field!r}")
+            conditions.append(f"json_extract(c.metadata, '$.{field}') IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        if source_url_prefix:
+            conditions.append("substr(json_extract(c.metadata, '$.source_url'), 1, ?) = ?")
+            params.extend([len(source_url_prefix), source_url_prefix])
+        params.append(k)
+        try:
+            rows = self._connection().execute(
+                f"""
+                SELECT c.content, c.metadata, bm25(chunks_fts) AS score
+                FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid
+                WHERE {' AND '.join(conditions)}
+                ORDER BY score
+                LIMIT ?
+                """,
+                params
+            ).fetchall()
+        except sqlite3.Error as e:
+            logging.warning(f"Lexical search failed for {query!r}: {e}")
+            return []
+        # FTS5 bm25() is negative, lower is better; flip it so higher means more relevant.
+        return [(Document(page_content=content, metadata=json.loads(metadata)), -score) for content, metadata, score in rows]
+
+    @contextmanager
+    def _rebuild_lock(self) -> Iterator[bool]:
+        # flock is shared by every process on this host, so only one API worker rebuilds the index.
+        with open(self.path + ".lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def rebuild_from_vectorstore(
+        self, vectorstore: Any, id_key: str = "doc_id", batch_size: int = 1000, only_if_empty: bool = False
+    ) -> Optional[int]:
+        """Re-creates the index from the chunks already stored in the vector store.
+
+        Chunks are first copied into a shadow table and swapped in with one transaction, so
+        searches keep using the old index until the new one is complete. Returns the number of
+        chunks indexed, or None when another process is already rebuilding (or, with
+        only_if_empty, when the index already has chunks).
+        """
+        with self._rebuild_lock() as acquired:
+            if not acquired or (only_if_empty and self.count() > 0):
+                return None
+            conn = self._connection()
+            with conn:
+                conn.execute("DROP TABLE IF EXISTS chunks_rebuild")
+                conn.execute("CREATE TABLE chunks_rebuild (parent_id TEXT NOT NULL, content TEXT NOT NULL, metadata TEXT NOT NULL)")
+            try:
+                for batch in _vectorstore_batches(vectorstore, batch_size):
+                    texts = batch.get("documents") or []
+                    metadatas = batch.get("metadatas") or [{}] * len(texts)
+                    rows = [
+                        (metadata[id_key], text, json.dumps(metadata))
+                        for text, metadata in zip(texts, (m or {} for m in metadatas))
+                        if id_key in metadata
+                    ]
+                    with conn:
+                        conn.executemany("INSERT INTO chunks_rebuild (parent_id, content, metadata) VALUES (?, ?, ?)", rows)
+                with conn:
+                    # The triggers keep chunks_fts in step with both statements.
+                    conn.execute("DELETE FROM chunks")
+                    conn.execute("INSERT INTO chunks (parent_id, content, metadata) SELECT parent_id, content, metadata FROM chunks_rebuild")
+                    conn.execute("DROP TABLE chunks_rebuild")
+                return conn.execute("SELECT count(*) FROM chunks").fetchone()[0]
+            except BaseException:
+                with conn:
+                    conn.execute("DROP TABLE IF EXISTS chunks_rebuild")
+                raise
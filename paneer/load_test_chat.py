@@ -0,0 +1,104 @@
+import os
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+import jwt
+import httpx
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key")
+
+DEFAULT_MESSAGES = [
+    "What is the hostel fee for first year B.Tech students?",
+    "Who is the head of the Computer Science department?",
+    "When does the odd semester start?",
+    "How do I apply for a transcript?",
+    "What scholarships are available for PG students?",
+]
+
+
+async def one_session(client, url, token, message):
+    # Fresh session per request so history length stays constant across levels.
+    body = {"message": message, "session_id": f"loadtest-{uuid.uuid4()}"}
+    start = time.perf_counter()
+    first, last, max_gap, frames = None, start, 0.0, 0
+    async with client.stream("POST", url, json=body, headers={"Authorization": f"Bearer {token}"}) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            now = time.perf_counter()
+            if first is None:
+                first = now - start
+            else:
+                max_gap = max(max_gap, now - last)
+            last = now
+            frames += 1
+    return first if first is not None else last - start, last - start, max_gap, frames
+
+
+async def run_level(url, token, messages, concurrency, timeout):
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        tasks = [one_session(client, url, token, messages[i % len(messages)]) for i in range(concurrency)]
+        start = time.perf_counter()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        wall = time.perf_counter() - start
+    ok = [r for r in results if not isinstance(r, BaseException)]
+    errors = [r for r in results if isinstance(r, BaseException)]
+    return ok, errors, wall
+
+
+def report(concurrency, ok, errors, wall):
+    if not ok:
+        print(f"{concurrency:>5}  all {len(errors)} sessions failed: {errors[0]!r}")
+        return None
+    ttfb, total, gaps, _ = (np.array(col) * 1000 for col in zip(*ok))
+    print(
+        f"{concurrency:>5}  ttfb p50 {np.percentile(ttfb, 50):7.0f} p95 {np.percentile(ttfb, 95):7.0f} ms  "
+        f"total p50 {np.percentile(total, 50):7.0f} p95 {np.percentile(total, 95):7.0f} ms  "
+        f"max stall p95 {np.percentile(gaps, 95):6.0f} ms  errors {len(errors):>3}  wall {wall:5.1f}s"
+    )
+    return np.percentile(ttfb, 95)
+
+
+async def main(args):
+    token = jwt.encode({"user_id": args.user_id}, JWT_SECRET, algorithm="HS256")
+    url = args.url.rstrip("/") + "/chat"
+    messages = DEFAULT_MESSAGES
+    if args.messages:
+        with open(args.messages) as f:
+            messages = [line.strip() for line in f if line.strip()]
+    if not messages:
+        sys.exit("No messages to send.")
+
+    levels = [int(level) for level in args.levels.split(",")]
+    print(f"Target {url}; a level is sustainable with no errors and p95 time to first frame <= {args.max_ttfb_ms:.0f} ms\n")
+    sustainable = 0
+    for concurrency in levels:
+        ok, errors, wall = await run_level(url, token, messages, concurrency, args.timeout)
+        p95 = report(concurrency, ok, errors, wall)
+        if p95 is None or errors or p95 > args.max_ttfb_ms:
+            if args.stop_on_fail:
+                break
+            continue
+        sustainable = concurrency
+    print(f"\nSustainable concurrent sessions per worker: {sustainable}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open concurrent /chat streams and report per-worker session capacity.")
+    parser.add_argument("--url", default="http://localhost:8000", help="Point at a single worker to measure per-worker capacity.")
+    parser.add_argument("--user-id", required=True, help="Existing user id; admin rights are not needed.")
+    parser.add_argument("--messages", help="File with one message per line.")
+    parser.add_argument("--levels", default="1,2,4,8,16,32,64")
+    parser.add_argument("--max-ttfb-ms", type=float, default=3000)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--stop-on-fail", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args))
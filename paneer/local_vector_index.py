@@ -0,0 +1,523 @@
+import os
+import copy
+import json
+import uuid
+import fcntl
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+LOCAL_VECTOR_INDEX_PATH = os.getenv(
+    "LOCAL_VECTOR_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "vector_index")
+)
+# "float32" or "int8" (per-row scaled, 4x smaller, slightly less precise scores).
+LOCAL_VECTOR_INDEX_DTYPE = os.getenv("LOCAL_VECTOR_INDEX_DTYPE", "float32")
+
+MANIFEST = "manifest.json"
+# Rows scored per matrix product; bounds the temporary float32 copy made for int8 segments.
+SCORE_BLOCK_ROWS = 65536
+# A write merges all segments into one when this share of rows is deleted or there are too many segments.
+COMPACT_DELETED_RATIO = 0.25
+COMPACT_MAX_SEGMENTS = 16
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+class _Segment:
+    """One immutable batch of rows. Vectors are memory-mapped, so every worker shares the same pages."""
+
+    def __init__(self, directory: str, entry: Dict[str, Any]) -> None:
+        self.name = entry["name"]
+        self.count = entry["count"]
+        self.deleted_file = entry.get("deleted")
+        base = os.path.join(directory, self.name)
+
+        self.vectors = np.load(f"{base}.vectors.npy", mmap_mode="r")
+        self.scales = np.load(f"{base}.scales.npy", mmap_mode="r") if os.path.exists(f"{base}.scales.npy") else None
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        with open(f"{base}.records.jsonl", encoding="utf-8") as f:
+            for line in f:
+                doc_id, text, metadata = json.loads(line)
+                self.ids.append(doc_id)
+                self.documents.append(text)
+                self.metadatas.append(metadata)
+        if self.deleted_file:
+            self.deleted = np.load(os.path.join(directory, self.deleted_file))
+        else:
+            self.deleted = np.zeros(self.count, dtype=bool)
+        self._postings: Dict[str, Dict[Any, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def with_deleted(self, deleted_file: str, deleted: np.ndarray) -> "_Segment":
+        # Shares the mapped vectors and records; only the deletion bitmap differs.
+        segment = copy.copy(self)
+        segment.deleted_file, segment.deleted = deleted_file, deleted
+        return segment
+
+    def postings(self, field: str) -> Dict[Any, np.ndarray]:
+        # Inverted index from metadata value to row numbers, built the first time a filter uses the field.
+        with self._lock:
+            if field not in self._postings:
+                rows: Dict[Any, List[int]] = {}
+                for row, metadata in enumerate(self.metadatas):
+                    value = metadata.get(field) if field != "id" else self.ids[row]
+                    if value is not None:
+                        rows.setdefault(value, []).append(row)
+                self._postings[field] = {value: np.array(r, dtype=np.int64) for value, r in rows.items()}
+            return self._postings[field]
+
+    def scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        # query is one vector (dim,) or several as columns (dim, n); either way the rows are read once.
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        out = np.empty((len(vectors),) + query.shape[1:], dtype=np.float32)
+        for start in range(0, len(vectors), SCORE_BLOCK_ROWS):
+            block = vectors[start:start + SCORE_BLOCK_ROWS]
+            out[start:start + len(block)] = block.astype(np.float32, copy=False) @ query
+        if self.scales is not None:
+            scales = self.scales if rows is None else self.scales[rows]
+            out *= scales.reshape((-1,) + (1,) * (query.ndim - 1))
+        return out
+
+
+def _rows_mask(segment: _Segment, field: str, values: Iterable[Any]) -> np.ndarray:
+    mask = np.zeros(segment.count, dtype=bool)
+    postings = segment.postings(field)
+    for value in values:
+        rows = postings.get(value)
+        if rows is not None:
+            mask[rows] = True
+    return mask
+
+
+def _compare_mask(segment: _Segment, field: str, predicate: Callable[[Any], bool]) -> np.ndarray:
+    mask = np.zeros(segment.count, dtype=bool)
+    for value, rows in segment.postings(field).items():
+        try:
+            if predicate(value):
+                mask[rows] = True
+        except TypeError:
+            continue
+    return mask
+
+
+def where_mask(segment: _Segment, where: Optional[Dict[str, Any]]) -> np.ndarray:
+    """Evaluates a Chroma-style `where` clause ($eq, $ne, $in, $nin, $gt(e), $lt(e), $and, $or)."""
+    mask = np.ones(segment.count, dtype=bool)
+    for key, condition in (where or {}).items():
+        if key == "$and":
+            for clause in condition:
+                mask &= where_mask(segment, clause)
+        elif key == "$or":
+            any_mask = np.zeros(segment.count, dtype=bool)
+            for clause in condition:
+                any_mask |= where_mask(segment, clause)
+            mask &= any_mask
+        elif isinstance(condition, dict):
+            for op, value in condition.items():
+                if op == "$eq":
+                    mask &= _rows_mask(segment, key, [value])
+                elif op == "$ne":
+                    mask &= ~_rows_mask(segment, key, [value])
+                elif op == "$in":
+                    mask &= _rows_mask(segment, key, value)
+                elif op == "$nin":
+                    mask &= ~_rows_mask(segment, key, value)
+                elif op == "$gt":
+                    mask &= _compare_mask(segment, key, lambda v: v > value)
+                elif op == "$gte":
+                    mask &= _compare_mask(segment, key, lambda v: v >= value)
+                elif op == "$lt":
+                    mask &= _compare_mask(segment, key, lambda v: v < value)
+                elif op == "$lte":
+                    mask &= _compare_mask(segment, key, lambda v: v <= value)
+                else:
+                    raise ValueError(f"Unsupported where operator: {op}")
+        else:
+            mask &= _rows_mask(segment, key, [condition])
+    return mask
+
+
+class LocalVectorIndex(VectorStore):
+    """In-process brute-force cosine index persisted as memory-mapped .npy segments.
+
+    Writes add a new segment or a new deletion bitmap and then atomically replace the manifest,
+    under an exclusive file lock, so the API workers and the crawler can share one directory.
+    Readers notice a replaced manifest on their next query and map the new files.
+    """
+
+    def __init__(self, embedding_function: Embeddings, path: str = LOCAL_VECTOR_INDEX_PATH, dtype: str = LOCAL_VECTOR_INDEX_DTYPE) -> None:
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported dtype {dtype!r}; expected 'float32' or 'int8'")
+        self.embedding_function = embedding_function
+        self.path = path
+        self.dtype = dtype
+        os.makedirs(path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._manifest_stamp = None
+        self._segments: List[_Segment] = []
+        self._segment_cache: Dict[Tuple[str, Optional[str]], _Segment] = {}
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    # --- manifest and segment files -------------------------------------------------------
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, MANIFEST)
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self._manifest_path(), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"segments": []}
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        tmp_path = f"{self._manifest_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._manifest_path())
+
+    def _state(self) -> List[_Segment]:
+        for _ in range(5):
+            try:
+                stat = os.stat(self._manifest_path())
+                stamp = (stat.st_ino, stat.st_mtime_ns)
+            except FileNotFoundError:
+                stamp = None
+            with self._lock:
+                if stamp == self._manifest_stamp:
+                    return self._segments
+                try:
+                    segments = self._load_segments(self._read_manifest()["segments"])
+                except FileNotFoundError:
+                    # A writer compacted the files away between reading the manifest and opening them.
+                    continue
+                self._segments, self._manifest_stamp = segments, stamp
+                return segments
+        raise RuntimeError(f"Local vector index at {self.path} kept changing while loading")
+
+    @contextmanager
+    def _locked_manifest(self) -> Iterator[Dict[str, Any]]:
+        with self._write_lock, open(os.path.join(self.path, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield self._read_manifest()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_segment(self, ids: Sequence[str], vectors: np.ndarray, documents: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        name = f"seg-{uuid.uuid4().hex}"
+        base = os.path.join(self.path, name)
+        vectors = _normalize(vectors)
+        if self.dtype == "int8":
+            vectors, scales = _quantize(vectors)
+            np.save(f"{base}.scales.npy", scales)
+        np.save(f"{base}.vectors.npy", vectors)
+        with open(f"{base}.records.jsonl", "w", encoding="utf-8") as f:
+            for record in zip(ids, documents, metadatas):
+                f.write(json.dumps(record) + "\n")
+        return {"name": name, "count": len(ids), "deleted": None}
+
+    def _write_deleted(self, segment: _Segment, deleted: np.ndarray) -> str:
+        filename = f"{segment.name}.deleted-{uuid.uuid4().hex}.npy"
+        np.save(os.path.join(self.path, filename), deleted)
+        return filename
+
+    def _remove_unreferenced(self, manifest: Dict[str, Any]) -> None:
+        keep = {MANIFEST, ".lock"}
+        for entry in manifest["segments"]:
+            keep.update(f"{entry['name']}.{suffix}" for suffix in ("vectors.npy", "scales.npy", "records.jsonl"))
+            if entry.get("deleted"):
+                keep.add(entry["deleted"])
+        for filename in os.listdir(self.path):
+            if filename not in keep and filename.startswith("seg-"):
+                try:
+                    # Readers that already mapped the file keep its pages until they reload.
+                    os.remove(os.path.join(self.path, filename))
+                except FileNotFoundError:
+                    pass
+
+    def _commit(self, manifest: Dict[str, Any], segments: List[_Segment]) -> None:
+        live = sum(int((~s.deleted).sum()) for s in segments)
+        total = sum(s.count for s in segments)
+        if segments and (len(segments) > COMPACT_MAX_SEGMENTS or (total and 1 - live / total > COMPACT_DELETED_RATIO)):
+            manifest["segments"] = [self._compact(segments)] if live else []
+        self._write_manifest(manifest)
+        self._remove_unreferenced(manifest)
+
+    def _compact(self, segments: List[_Segment]) -> Dict[str, Any]:
+        ids, vectors, documents, metadatas = [], [], [], []
+        for segment in segments:
+            rows = np.flatnonzero(~segment.deleted)
+            stored = np.asarray(segment.vectors[rows], dtype=np.float32)
+            if segment.scales is not None:
+                stored *= np.asarray(segment.scales[rows])[:, None]
+            vectors.append(stored)
+            for row in rows:
+                ids.append(segment.ids[row])
+                documents.append(segment.documents[row])
+                metadatas.append(segment.metadatas[row])
+        return self._write_segment(ids, np.concatenate(vectors), documents, metadatas)
+
+    def _load_segments(self, entries: Sequence[Dict[str, Any]]) -> List[_Segment]:
+        # Segments are immutable, so anything already mapped for the same files is reused.
+        cache = {}
+        for entry in entries:
+            key = (entry["name"], entry.get("deleted"))
+            segment = self._segment_cache.get(key)
+            if segment is None:
+                base = next((s for (name, _), s in self._segment_cache.items() if name == entry["name"]), None)
+                if base is not None and entry.get("deleted"):
+                    segment = base.with_deleted(entry["deleted"], np.load(os.path.join(self.path, entry["deleted"])))
+                else:
+                    segment = _Segment(self.path, entry)
+            cache[key] = segment
+        self._segment_cache = cache
+        return list(cache.values())
+
+    def _segments_for(self, manifest: Dict[str, Any]) -> List[_Segment]:
+        with self._lock:
+            return self._load_segments(manifest["segments"])
+
+    def _mark_deleted(self, entry: Dict[str, Any], segment: _Segment, mask: np.ndarray) -> _Segment:
+        deleted = segment.deleted | mask
+        entry["deleted"] = self._write_deleted(segment, deleted)
+        updated = segment.with_deleted(entry["deleted"], deleted)
+        with self._lock:
+            self._segment_cache[(updated.name, updated.deleted_file)] = updated
+        return updated
+
+    # --- writes ---------------------------------------------------------------------------
+
+    def add_embeddings(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        documents: Sequence[str],
+        metadatas: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+        ids: Optional[Sequence[str]] = None,
+    ) -> List[str]:
+        if not documents:
+            return []
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in documents]
+        metadatas = [m or {} for m in (metadatas or [{}] * len(documents))]
+        with self._locked_manifest() as manifest:
+            segments = self._segments_for(manifest)
+            # Re-adding an id replaces the earlier row, as a Chroma upsert would.
+            for i, (entry, segment) in enumerate(zip(manifest["segments"], segments)):
+                replaced = _rows_mask(segment, "id", ids) & ~segment.deleted
+                if replaced.any():
+                    segments[i] = self._mark_deleted(entry, segment, replaced)
+            entry = self._write_segment(ids, np.asarray(embeddings, dtype=np.float32), documents, metadatas)
+            manifest["segments"].append(entry)
+            self._commit(manifest, segments + [_Segment(self.path, entry)])
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_embeddings(self.embedding_function.embed_documents(texts), texts, metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids and not where:
+            return False
+        with self._locked_manifest() as manifest:
+            segments = self._segments_for(manifest)
+            changed = False
+            for i, (entry, segment) in enumerate(zip(manifest["segments"], segments)):
+                mask = where_mask(segment, where) if where else np.ones(segment.count, dtype=bool)
+                if ids:
+                    mask &= _rows_mask(segment, "id", ids)
+                mask &= ~segment.deleted
+                if mask.any():
+                    segments[i] = self._mark_deleted(entry, segment, mask)
+                    changed = True
+            if changed:
+                self._commit(manifest, segments)
+        return True
+
+    def replace_all(
+        self,
+        ids: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        documents: Sequence[str],
+        metadatas: Sequence[Optional[Dict[str, Any]]],
+    ) -> None:
+        """Swaps the whole index for the given rows in one manifest update."""
+        with self._locked_manifest() as manifest:
+            manifest["segments"] = []
+            if len(ids):
+                vectors = np.asarray(embeddings, dtype=np.float32)
+                manifest["segments"].append(self._write_segment(list(ids), vectors, list(documents), [m or {} for m in metadatas]))
+            self._write_manifest(manifest)
+            self._remove_unreferenced(manifest)
+
+    # --- reads ----------------------------------------------------------------------------
+
+    def count(self) -> int:
+        return sum(int((~s.deleted).sum()) for s in self._state())
+
+    def similarity_search_with_score_by_vectors(
+        self, embeddings: Sequence[Sequence[float]], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[List[Tuple[Document, float]]]:
+        """Searches several query vectors sharing one filter in a single pass over each segment."""
+        if not len(embeddings):
+            return []
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32)).T
+        candidates: List[List[Tuple[float, _Segment, int]]] = [[] for _ in range(queries.shape[1])]
+        for segment in self._state():
+            valid = ~segment.deleted
+            if filter:
+                valid &= where_mask(segment, filter)
+            rows = np.flatnonzero(valid)
+            if not len(rows):
+                continue
+            # Selective filters score only the matching rows instead of the whole segment.
+            if len(rows) < segment.count // 4:
+                scores = segment.scores(queries, rows)
+            else:
+                scores = segment.scores(queries)[rows]
+            for column, found in enumerate(candidates):
+                column_scores = scores[:, column]
+                top = np.argpartition(-column_scores, k - 1)[:k] if len(rows) > k else np.arange(len(rows))
+                found.extend((float(column_scores[i]), segment, int(rows[i])) for i in top)
+
+        results = []
+        for found in candidates:
+            found.sort(key=lambda c: c[0], reverse=True)
+            results.append([
+                (Document(id=segment.ids[row], page_content=segment.documents[row], metadata=dict(segment.metadatas[row])), score)
+                for score, segment, row in found[:k]
+            ])
+        return results
+
+    def similarity_search_by_vectors(
+        self, embeddings: Sequence[Sequence[float]], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[List[Document]]:
+        return [[doc for doc, _ in hits] for hits in self.similarity_search_with_score_by_vectors(embeddings, k, filter)]
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: Sequence[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vectors([embedding], k, filter)[0]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding_function.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Cosine similarity in [-1, 1] mapped to [0, 1].
+        return lambda score: (score + 1) / 2
+
+    def _valid_rows(self, segment: _Segment, ids: Optional[Sequence[str]], where: Optional[Dict[str, Any]]) -> np.ndarray:
+        valid = ~segment.deleted
+        if where:
+            valid &= where_mask(segment, where)
+        if ids:
+            valid &= _rows_mask(segment, "id", ids)
+        return np.flatnonzero(valid)
+
+    @staticmethod
+    def _collect(segment: _Segment, rows: np.ndarray, include: Sequence[str]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"ids": [segment.ids[row] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [segment.documents[row] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [dict(segment.metadatas[row]) for row in rows]
+        if "embeddings" in include:
+            vectors = np.asarray(segment.vectors[rows], dtype=np.float32)
+            if segment.scales is not None:
+                vectors = vectors * segment.scales[rows].reshape(-1, 1)
+            result["embeddings"] = vectors.tolist()
+        return result
+
+    def get(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        include: Sequence[str] = ("documents", "metadatas"),
+    ) -> Dict[str, Any]:
+        """Chroma-compatible get(); rows come back in insertion order."""
+        result: Dict[str, Any] = {field: [] for field in ("ids", "documents", "metadatas", "embeddings") if field == "ids" or field in include}
+        for segment in self._state():
+            if limit is not None and len(result["ids"]) >= limit:
+                break
+            rows = self._valid_rows(segment, ids, where)
+            # Whole segments before the offset are skipped by their row count alone.
+            if offset >= len(rows):
+                offset -= len(rows)
+                continue
+            rows, offset = rows[offset:], 0
+            if limit is not None:
+                rows = rows[:limit - len(result["ids"])]
+            for field, values in self._collect(segment, rows, include).items():
+                result[field].extend(values)
+        return result
+
+    def iter_batches(
+        self,
+        batch_size: int = 1000,
+        where: Optional[Dict[str, Any]] = None,
+        include: Sequence[str] = ("documents", "metadatas"),
+    ) -> Iterator[Dict[str, Any]]:
+        """Yields get()-shaped batches covering every row of one snapshot, in insertion order.
+
+        Unlike paging get() by offset, the rows are walked once, and writes made meanwhile
+        neither shift nor repeat rows.
+        """
+        for segment in self._state():
+            rows = self._valid_rows(segment, None, where)
+            for start in range(0, len(rows), batch_size):
+                yield self._collect(segment, rows[start:start + batch_size], include)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> "LocalVectorIndex":
+        index = cls(embedding, **kwargs)
+        index.add_texts(texts, metadatas, ids=ids)
+        return index
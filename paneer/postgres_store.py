@@ -1,6 +1,130 @@
+import io
+import os
+import json
+import base64
+import time
+import asyncio
+import threading
 import psycopg2
-from typing import Iterator, List, Optional, Sequence, Tuple
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 from langchain_core.stores import ByteStore
+from docstore_codec import decode_fields
+
+POSTGRES_POOL_MIN = int(os.getenv("POSTGRES_POOL_MIN", 1))
+POSTGRES_POOL_MAX = int(os.getenv("POSTGRES_POOL_MAX", 10))
+# Idle connections older than this are pinged with `SELECT 1` before reuse.
+POSTGRES_POOL_IDLE_CHECK_SECONDS = float(os.getenv("POSTGRES_POOL_IDLE_CHECK_SECONDS", 30))
+POSTGRES_SCAN_PAGE_SIZE = int(os.getenv("POSTGRES_SCAN_PAGE_SIZE", 1000))
+# Batches at or above this size are loaded with COPY into a staging table; smaller ones use multi-row VALUES.
+POSTGRES_COPY_THRESHOLD = int(os.getenv("POSTGRES_COPY_THRESHOLD", 1000))
+POSTGRES_VALUES_PAGE_SIZE = 500
+POSTGRES_COPY_CHUNK_SIZE = 10000
+# Only this much of a parent's text goes into the full-text index.
+SEARCH_TEXT_MAX_CHARS = 100000
+# Length of the stored preview returned by snippet-mode listings.
+PREVIEW_CHARS = 280
+POSTGRES_ASYNC_POOL_MIN = int(os.getenv("POSTGRES_ASYNC_POOL_MIN", 1))
+POSTGRES_ASYNC_POOL_MAX = int(os.getenv("POSTGRES_ASYNC_POOL_MAX", 10))
+
+
+class PostgresConnectionPool:
+    def __init__(
+        self,
+        connection_string: str,
+        minconn: int = POSTGRES_POOL_MIN,
+        maxconn: int = POSTGRES_POOL_MAX,
+        idle_check_seconds: float = POSTGRES_POOL_IDLE_CHECK_SECONDS,
+    ) -> None:
+        self.connection_string = connection_string
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.idle_check_seconds = idle_check_seconds
+        self._pool = ThreadedConnectionPool(minconn, maxconn, connection_string)
+        # ThreadedConnectionPool raises when exhausted; the semaphore makes callers wait instead.
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used: Dict[int, float] = {}
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.idle_check_seconds:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def getconn(self):
+        self._slots.acquire()
+        try:
+            for _ in range(self.maxconn + 1):
+                conn = self._pool.getconn()
+                if self._is_healthy(conn):
+                    return conn
+                self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+            raise psycopg2.OperationalError("Could not obtain a healthy Postgres connection from the pool.")
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, close: bool = False) -> None:
+        try:
+            if close or conn.closed:
+                self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            if conn.closed:
+                broken = True
+            else:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                broken = True
+            raise
+        finally:
+            self.putconn(conn, close=broken)
+
+    def closeall(self) -> None:
+        self._pool.closeall()
+        self._last_used.clear()
+
+
+_SHARED_POOLS: Dict[str, PostgresConnectionPool] = {}
+_SHARED_POOLS_LOCK = threading.Lock()
+
+
+def get_shared_pool(connection_string: str) -> PostgresConnectionPool:
+    with _SHARED_POOLS_LOCK:
+        pool = _SHARED_POOLS.get(connection_string)
+        if pool is None:
+            pool = PostgresConnectionPool(connection_string)
+            _SHARED_POOLS[connection_string] = pool
+        return pool
+
 
 class PostgresByteStore(ByteStore):
     def __init__(
@@ -8,14 +132,21 @@ class PostgresByteStore(ByteStore):
         connection_string: str,
         table_name: str = "doc_store",
         schema: str = "public",
+        pool: Optional[PostgresConnectionPool] = None,
+        scan_page_size: int = POSTGRES_SCAN_PAGE_SIZE,
+        value_fields: Callable[[bytes], Tuple[str, Dict[str, Any], Optional[str]]] = decode_fields,
     ) -> None:
         self.connection_string = connection_string
         self.table_name = table_name
         self.schema = schema
+        self.pool = pool or get_shared_pool(connection_string)
+        self.scan_page_size = scan_page_size
+        # Decodes a stored value into (page_content, metadata, id) to fill the indexed columns.
+        self.value_fields = value_fields
         self._create_table_if_not_exists()
 
     def _create_table_if_not_exists(self) -> None:
-        with psycopg2.connect(self.connection_string) as conn:
+        with self.pool.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     f"""
@@ -25,13 +156,259 @@ class PostgresByteStore(ByteStore):
                     );
                     """
                 )
-            conn.commit()
+                # Byte-ordered index so key scans can use plain range predicates for keyset paging and prefixes.
+                cur.execute(
+                    f"""
+                    CREATE INDEX IF NOT EXISTS {self.table_name}_key_c_idx
+                    ON {self.schema}.{self.table_name} (key COLLATE "C");
+                    """
+                )
+                # Denormalized document fields so the admin list can filter and search in SQL.
+                cur.execute(
+                    f"""
+                    ALTER TABLE {self.schema}.{self.table_name}
+                        ADD COLUMN IF NOT EXISTS source_url TEXT,
+                        ADD COLUMN IF NOT EXISTS title TEXT,
+                        ADD COLUMN IF NOT EXISTS content_type TEXT,
+                        ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                        ADD COLUMN IF NOT EXISTS search_tsv TSVECTOR,
+                        ADD COLUMN IF NOT EXISTS preview TEXT;
+                    CREATE INDEX IF NOT EXISTS {self.table_name}_source_url_idx
+                        ON {self.schema}.{self.table_name} (source_url COLLATE "C");
+                    CREATE INDEX IF NOT EXISTS {self.table_name}_content_type_idx
+                        ON {self.schema}.{self.table_name} (content_type);
+                    CREATE INDEX IF NOT EXISTS {self.table_name}_updated_at_idx
+                        ON {self.schema}.{self.table_name} (updated_at DESC, key);
+                    CREATE INDEX IF NOT EXISTS {self.table_name}_search_tsv_idx
+                        ON {self.schema}.{self.table_name} USING GIN (search_tsv);
+                    """
+                )
+
+        # pg_trgm may not be installable by this role; title ILIKE still works without the index.
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                    cur.execute(
+                        f"""
+                        CREATE INDEX IF NOT EXISTS {self.table_name}_title_trgm_idx
+                        ON {self.schema}.{self.table_name} USING GIN (title gin_trgm_ops);
+                        """
+                    )
+        except psycopg2.Error as e:
+            print(f"Warning: pg_trgm unavailable, title search will not be indexed: {e}")
+
+    def _indexed_row(self, key: str, value: Optional[bytes]) -> tuple:
+        # (key, value, source_url, title, content_type, content); values that are not documents get NULL fields.
+        source_url = title = content_type = content = None
+        if value is not None:
+            try:
+                page_content, metadata, _ = self.value_fields(bytes(value))
+            except Exception:
+                page_content, metadata = None, {}
+            source_url = _text_column(metadata.get("source_url"))
+            title = _text_column(metadata.get("title"))
+            content_type = _text_column(metadata.get("content_type"))
+            content = _text_column(page_content[:SEARCH_TEXT_MAX_CHARS] if isinstance(page_content, str) else None)
+        return (key, value, source_url, title, content_type, content)
+
+    def _prepare_rows(self, key_value_pairs: Sequence[Tuple[str, bytes]]) -> List[tuple]:
+        # A single upsert statement may not touch the same key twice; keep the last value like executemany did.
+        return [self._indexed_row(k, v) for k, v in dict(key_value_pairs).items()]
+
+    def _upsert_sql(self, source: str) -> str:
+        # `source` must produce the columns (key, value, source_url, title, content_type, content).
+        return f"""
+            INSERT INTO {self.schema}.{self.table_name}
+                (key, value, source_url, title, content_type, updated_at, search_tsv, preview)
+            SELECT key, value, source_url, title, content_type, now(),
+                setweight(to_tsvector('english', coalesce(title, '')), 'A')
+                || setweight(to_tsvector('english', coalesce(content, '')), 'B'),
+                left(coalesce(content, ''), {PREVIEW_CHARS})
+            FROM {source}
+            ON CONFLICT (key) DO UPDATE SET
+                value = EXCLUDED.value,
+                source_url = EXCLUDED.source_url,
+                title = EXCLUDED.title,
+                content_type = EXCLUDED.content_type,
+                updated_at = EXCLUDED.updated_at,
+                search_tsv = EXCLUDED.search_tsv,
+                preview = EXCLUDED.preview;
+        """
+
+    def _filter_sql(
+        self,
+        param: Callable[[Any], str],
+        query: Optional[str],
+        content_type: Optional[str],
+        source_url_prefix: Optional[str],
+    ) -> Tuple[str, Optional[str]]:
+        # Returns the WHERE clause and, for text searches, the rank expression.
+        conditions = []
+        rank = None
+        if query:
+            tsquery = f"websearch_to_tsquery('english', {param(query)})"
+            title_match = f"title ILIKE {param('%' + _escape_like(query) + '%')}"
+            conditions.append(f"(search_tsv @@ {tsquery} OR {title_match})")
+            rank = f"ts_rank_cd(search_tsv, {tsquery}) + CASE WHEN {title_match} THEN 1 ELSE 0 END"
+        if content_type:
+            conditions.append(f"content_type = {param(content_type)}")
+        if source_url_prefix:
+            conditions.append(f'source_url COLLATE "C" >= {param(source_url_prefix)}')
+            upper = _prefix_upper_bound(source_url_prefix)
+            if upper is not None:
+                conditions.append(f'source_url COLLATE "C" < {param(upper)}')
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, rank
+
+    def _list_sql(
+        self,
+        param: Callable[[Any], str],
+        query: Optional[str],
+        content_type: Optional[str],
+        source_url_prefix: Optional[str],
+        limit: int,
+        offset: int,
+        cursor: Optional[str],
+        snippet: bool,
+    ) -> Tuple[str, List[str]]:
+        where, rank = self._filter_sql(param, query, content_type, source_url_prefix)
+
+        # (column, descending) in sort order; the last row's values of these columns form the next cursor.
+        order = [("updated_at", True), ("key", False)]
+        columns = f"key, {'preview' if snippet else 'value'} AS body, title, source_url, content_type, updated_at"
+        if rank:
+            columns += f", {rank} AS rank"
+            order.insert(0, ("rank", True))
+
+        outer_where = ""
+        if cursor:
+            after = _decode_cursor(cursor, len(order))
+            outer_where = f"WHERE {_keyset_condition(order, after, param)}"
+
+        order_by = ", ".join(f"{column} {'DESC' if descending else 'ASC'}" for column, descending in order)
+        sql = f"""
+            SELECT * FROM (
+                SELECT {columns} FROM {self.schema}.{self.table_name} {where}
+            ) AS matches
+            {outer_where}
+            ORDER BY {order_by}
+            LIMIT {param(limit)} OFFSET {param(offset)}
+        """
+        return sql, [column for column, _ in order]
+
+    def _estimate_sql(
+        self,
+        param: Callable[[Any], str],
+        query: Optional[str],
+        content_type: Optional[str],
+        source_url_prefix: Optional[str],
+    ) -> Tuple[str, bool]:
+        # Planner estimates instead of count(*), so the cost does not grow with the number of matches.
+        where, _ = self._filter_sql(param, query, content_type, source_url_prefix)
+        if not where:
+            return f"SELECT reltuples::bigint FROM pg_class WHERE oid = '{self.schema}.{self.table_name}'::regclass", False
+        return f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {self.schema}.{self.table_name} {where}", True
+
+    def _exact_count_sql(self) -> str:
+        return f"SELECT count(*) FROM {self.schema}.{self.table_name}"
+
+    def list_documents(
+        self,
+        query: Optional[str] = None,
+        content_type: Optional[str] = None,
+        source_url_prefix: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        snippet: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        params = {}
+
+        def param(value):
+            name = f"p{len(params)}"
+            params[name] = value
+            return f"%({name})s"
+
+        sql, cursor_columns = self._list_sql(
+            param, query, content_type, source_url_prefix, limit, offset, cursor, snippet
+        )
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                names = [d[0] for d in cur.description]
+                rows = [dict(zip(names, row)) for row in cur.fetchall()]
+        for row in rows:
+            if isinstance(row["body"], memoryview):
+                row["body"] = bytes(row["body"])
+        return rows, _next_cursor(rows, cursor_columns, limit)
+
+    def estimate_documents(
+        self,
+        query: Optional[str] = None,
+        content_type: Optional[str] = None,
+        source_url_prefix: Optional[str] = None,
+    ) -> int:
+        params = {}
+
+        def param(value):
+            name = f"p{len(params)}"
+            params[name] = value
+            return f"%({name})s"
+
+        sql, is_plan = self._estimate_sql(param, query, content_type, source_url_prefix)
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                result = cur.fetchone()[0]
+                if is_plan:
+                    return _plan_rows(result)
+                if result < 0:
+                    # Never analyzed yet; the table is new, so an exact count is cheap.
+                    cur.execute(self._exact_count_sql())
+                    result = cur.fetchone()[0]
+                return int(result)
+
+    def backfill_metadata(self, batch_size: int = 500) -> int:
+        # Fills the indexed columns for rows written before they existed. Safe to run from several workers.
+        updated = 0
+        while True:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"""
+                        SELECT key, value FROM {self.schema}.{self.table_name}
+                        WHERE search_tsv IS NULL OR preview IS NULL
+                        LIMIT %s FOR UPDATE SKIP LOCKED
+                        """,
+                        (batch_size,)
+                    )
+                    rows = [self._indexed_row(k, v) for k, v in cur.fetchall()]
+                    if not rows:
+                        return updated
+                    execute_values(
+                        cur,
+                        f"""
+                        UPDATE {self.schema}.{self.table_name} AS t SET
+                            source_url = r.source_url,
+                            title = r.title,
+                            content_type = r.content_type,
+                            search_tsv = setweight(to_tsvector('english', coalesce(r.title, '')), 'A')
+                                || setweight(to_tsvector('english', coalesce(r.content, '')), 'B'),
+                            preview = left(coalesce(r.content, ''), {PREVIEW_CHARS})
+                        FROM (VALUES %s) AS r(key, source_url, title, content_type, content)
+                        WHERE t.key = r.key
+                        """,
+                        [(k, url, title, ctype, content) for k, _, url, title, ctype, content in rows],
+                        page_size=POSTGRES_VALUES_PAGE_SIZE
+                    )
+            updated += len(rows)
 
     def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
         if not keys:
             return []
-        
-        with psycopg2.connect(self.connection_string) as conn:
+
+        with self.pool.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     f"SELECT key, value FROM {self.schema}.{self.table_name} WHERE key = ANY(%s)",
@@ -43,49 +420,374 @@ class PostgresByteStore(ByteStore):
                         results[k] = bytes(v)
                     else:
                         results[k] = None
-        
+
         return [results.get(key) for key in keys]
 
     def mset(self, key_value_pairs: Sequence[Tuple[str, bytes]]) -> None:
         if not key_value_pairs:
             return
 
-        with psycopg2.connect(self.connection_string) as conn:
+        rows = self._prepare_rows(key_value_pairs)
+
+        with self.pool.connection() as conn:
             with conn.cursor() as cur:
-                # Use upsert (INSERT ... ON CONFLICT DO UPDATE)
-                args_list = [(k, v) for k, v in key_value_pairs]
-                cur.executemany(
-                    f"""
-                    INSERT INTO {self.schema}.{self.table_name} (key, value)
-                    VALUES (%s, %s)
-                    ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value;
-                    """,
-                    args_list
-                )
-            conn.commit()
+                if len(rows) >= POSTGRES_COPY_THRESHOLD:
+                    self._mset_copy(cur, rows)
+                else:
+                    self._mset_values(cur, rows)
+
+    def _mset_values(self, cur, rows: List[tuple]) -> None:
+        execute_values(
+            cur,
+            self._upsert_sql("(VALUES %s) AS r(key, value, source_url, title, content_type, content)"),
+            rows,
+            page_size=POSTGRES_VALUES_PAGE_SIZE
+        )
+
+    def _mset_copy(self, cur, rows: List[tuple]) -> None:
+        staging = f"{self.table_name}_staging"
+        cur.execute(
+            f"""
+            CREATE TEMP TABLE {staging} (
+                key TEXT, value BYTEA, source_url TEXT, title TEXT, content_type TEXT, content TEXT
+            ) ON COMMIT DROP
+            """
+        )
+        for start in range(0, len(rows), POSTGRES_COPY_CHUNK_SIZE):
+            buffer = io.StringIO()
+            for k, v, source_url, title, content_type, content in rows[start:start + POSTGRES_COPY_CHUNK_SIZE]:
+                buffer.write(_copy_text(k))
+                buffer.write("\t")
+                buffer.write("\\N" if v is None else "\\\\x" + bytes(v).hex())
+                for field in (source_url, title, content_type, content):
+                    buffer.write("\t")
+                    buffer.write("\\N" if field is None else _copy_text(str(field)))
+                buffer.write("\n")
+            buffer.seek(0)
+            cur.copy_expert(
+                f"COPY {staging} (key, value, source_url, title, content_type, content) FROM STDIN",
+                buffer
+            )
+        cur.execute(self._upsert_sql(staging))
 
     def mdelete(self, keys: Sequence[str]) -> None:
         if not keys:
             return
 
-        with psycopg2.connect(self.connection_string) as conn:
+        with self.pool.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     f"DELETE FROM {self.schema}.{self.table_name} WHERE key = ANY(%s)",
                     (list(keys),)
                 )
-            conn.commit()
 
-    def yield_keys(self, prefix: Optional[str] = None) -> Iterator[str]:
-        with psycopg2.connect(self.connection_string) as conn:
+    def truncate(self) -> None:
+        with self.pool.connection() as conn:
             with conn.cursor() as cur:
-                if prefix:
+                cur.execute(f"TRUNCATE TABLE {self.schema}.{self.table_name}")
+
+    def yield_keys(self, prefix: Optional[str] = None, page_size: Optional[int] = None) -> Iterator[str]:
+        page_size = page_size or self.scan_page_size
+        lower = prefix or ""
+        upper = _prefix_upper_bound(prefix) if prefix else None
+        last_key = None
+
+        # Keyset pagination: each page is its own short query, so no connection is held between pages
+        # and memory stays bounded by page_size regardless of the table size.
+        while True:
+            conditions = []
+            params = []
+            if last_key is not None:
+                conditions.append('key COLLATE "C" > %s')
+                params.append(last_key)
+            elif lower:
+                conditions.append('key COLLATE "C" >= %s')
+                params.append(lower)
+            if upper is not None:
+                conditions.append('key COLLATE "C" < %s')
+                params.append(upper)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            params.append(page_size)
+
+            with self.pool.connection() as conn:
+                with conn.cursor() as cur:
                     cur.execute(
-                        f"SELECT key FROM {self.schema}.{self.table_name} WHERE key LIKE %s",
-                        (f"{prefix}%",)
+                        f'SELECT key FROM {self.schema}.{self.table_name} {where} ORDER BY key COLLATE "C" LIMIT %s',
+                        params
                     )
+                    rows = cur.fetchall()
+
+            for (key,) in rows:
+                if prefix and not key.startswith(prefix):
+                    return
+                yield key
+
+            if len(rows) < page_size:
+                return
+            last_key = rows[-1][0]
+
+
+class AsyncPostgresByteStore(PostgresByteStore):
+    """PostgresByteStore whose async methods run on an asyncpg pool instead of a worker thread.
+
+    The sync methods keep using the psycopg2 pool, so the store works for both the sync and async
+    paths of ParentDocumentRetriever.
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        table_name: str = "doc_store",
+        schema: str = "public",
+        pool: Optional[PostgresConnectionPool] = None,
+        scan_page_size: int = POSTGRES_SCAN_PAGE_SIZE,
+        async_min_size: int = POSTGRES_ASYNC_POOL_MIN,
+        async_max_size: int = POSTGRES_ASYNC_POOL_MAX,
+    ) -> None:
+        super().__init__(connection_string, table_name, schema, pool, scan_page_size)
+        self.async_min_size = async_min_size
+        self.async_max_size = async_max_size
+        self._async_pool = None
+        self._async_pool_loop = None
+        self._async_pool_lock = None
+
+    async def _get_async_pool(self):
+        import asyncpg
+
+        # asyncpg pools are bound to the event loop they were created on.
+        loop = asyncio.get_running_loop()
+        if self._async_pool is not None and self._async_pool_loop is loop:
+            return self._async_pool
+        if self._async_pool_loop is not loop:
+            self._async_pool = None
+            self._async_pool_loop = loop
+            self._async_pool_lock = asyncio.Lock()
+
+        async with self._async_pool_lock:
+            if self._async_pool is None:
+                self._async_pool = await asyncpg.create_pool(
+                    self.connection_string,
+                    min_size=self.async_min_size,
+                    max_size=self.async_max_size,
+                )
+        return self._async_pool
+
+    async def aclose(self) -> None:
+        if self._async_pool is not None:
+            await self._async_pool.close()
+            self._async_pool = None
+            self._async_pool_loop = None
+
+    async def amget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+
+        pool = await self._get_async_pool()
+        rows = await pool.fetch(
+            f"SELECT key, value FROM {self.schema}.{self.table_name} WHERE key = ANY($1::text[])",
+            list(keys)
+        )
+        results = {row["key"]: row["value"] for row in rows}
+        return [results.get(key) for key in keys]
+
+    async def amset(self, key_value_pairs: Sequence[Tuple[str, bytes]]) -> None:
+        if not key_value_pairs:
+            return
+
+        rows = self._prepare_rows(key_value_pairs)
+        pool = await self._get_async_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                if len(rows) >= POSTGRES_COPY_THRESHOLD:
+                    staging = f"{self.table_name}_staging"
+                    await conn.execute(
+                        f"""
+                        CREATE TEMP TABLE {staging} (
+                            key TEXT, value BYTEA, source_url TEXT, title TEXT, content_type TEXT, content TEXT
+                        ) ON COMMIT DROP
+                        """
+                    )
+                    await conn.copy_records_to_table(
+                        staging,
+                        records=rows,
+                        columns=["key", "value", "source_url", "title", "content_type", "content"]
+                    )
+                    await conn.execute(self._upsert_sql(staging))
                 else:
-                    cur.execute(f"SELECT key FROM {self.schema}.{self.table_name}")
-                
-                for row in cur.fetchall():
-                    yield row[0]
+                    await conn.execute(
+                        self._upsert_sql(
+                            "unnest($1::text[], $2::bytea[], $3::text[], $4::text[], $5::text[], $6::text[])"
+                            " AS r(key, value, source_url, title, content_type, content)"
+                        ),
+                        *[list(column) for column in zip(*rows)]
+                    )
+
+    async def alist_documents(
+        self,
+        query: Optional[str] = None,
+        content_type: Optional[str] = None,
+        source_url_prefix: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        snippet: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        params = []
+
+        def param(value):
+            params.append(value)
+            return f"${len(params)}"
+
+        sql, cursor_columns = self._list_sql(
+            param, query, content_type, source_url_prefix, limit, offset, cursor, snippet
+        )
+        pool = await self._get_async_pool()
+        rows = [dict(row) for row in await pool.fetch(sql, *params)]
+        return rows, _next_cursor(rows, cursor_columns, limit)
+
+    async def aestimate_documents(
+        self,
+        query: Optional[str] = None,
+        content_type: Optional[str] = None,
+        source_url_prefix: Optional[str] = None,
+    ) -> int:
+        params = []
+
+        def param(value):
+            params.append(value)
+            return f"${len(params)}"
+
+        sql, is_plan = self._estimate_sql(param, query, content_type, source_url_prefix)
+        pool = await self._get_async_pool()
+        result = await pool.fetchval(sql, *params)
+        if is_plan:
+            return _plan_rows(result)
+        if result < 0:
+            result = await pool.fetchval(self._exact_count_sql())
+        return int(result)
+
+    async def amdelete(self, keys: Sequence[str]) -> None:
+        if not keys:
+            return
+
+        pool = await self._get_async_pool()
+        await pool.execute(
+            f"DELETE FROM {self.schema}.{self.table_name} WHERE key = ANY($1::text[])",
+            list(keys)
+        )
+
+    async def atruncate(self) -> None:
+        pool = await self._get_async_pool()
+        await pool.execute(f"TRUNCATE TABLE {self.schema}.{self.table_name}")
+
+    async def ayield_keys(self, prefix: Optional[str] = None, page_size: Optional[int] = None) -> AsyncIterator[str]:
+        page_size = page_size or self.scan_page_size
+        upper = _prefix_upper_bound(prefix) if prefix else None
+        last_key = None
+        pool = await self._get_async_pool()
+
+        while True:
+            conditions = []
+            params = []
+            if last_key is not None:
+                params.append(last_key)
+                conditions.append(f'key COLLATE "C" > ${len(params)}')
+            elif prefix:
+                params.append(prefix)
+                conditions.append(f'key COLLATE "C" >= ${len(params)}')
+            if upper is not None:
+                params.append(upper)
+                conditions.append(f'key COLLATE "C" < ${len(params)}')
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            params.append(page_size)
+
+            rows = await pool.fetch(
+                f'SELECT key FROM {self.schema}.{self.table_name} {where} ORDER BY key COLLATE "C" LIMIT ${len(params)}',
+                *params
+            )
+
+            for row in rows:
+                if prefix and not row["key"].startswith(prefix):
+                    return
+                yield row["key"]
+
+            if len(rows) < page_size:
+                return
+            last_key = rows[-1]["key"]
+
+
+def _text_column(value: Any) -> Optional[str]:
+    # Postgres TEXT rejects NUL, which PDF extraction often leaves behind; the bytea value keeps the original.
+    # Non-string metadata (lists, numbers) is not worth indexing and would break the whole batch.
+    if not isinstance(value, str):
+        return None
+    return value.replace("\x00", "")
+
+
+def _copy_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _keyset_condition(order: List[Tuple[str, bool]], after: list, param: Callable[[Any], str]) -> str:
+    # Rows strictly after `after` in the given mixed-direction ordering.
+    clauses = []
+    for i, (column, descending) in enumerate(order):
+        parts = [f"{prev} = {param(value)}" for (prev, _), value in zip(order[:i], after[:i])]
+        parts.append(f"{column} {'<' if descending else '>'} {param(after[i])}")
+        clauses.append(f"({' AND '.join(parts)})")
+    # The redundant bound on the leading column lets Postgres use it as an index range.
+    leading, descending = order[0]
+    return f"{leading} {'<=' if descending else '>='} {param(after[0])} AND ({' OR '.join(clauses)})"
+
+
+def _encode_cursor_value(value: Any) -> Any:
+    return {"t": value.isoformat()} if isinstance(value, datetime) else value
+
+
+def _decode_cursor_value(value: Any) -> Any:
+    return datetime.fromisoformat(value["t"]) if isinstance(value, dict) else value
+
+
+def _next_cursor(rows: List[Dict[str, Any]], columns: List[str], limit: int) -> Optional[str]:
+    if len(rows) < limit or not rows:
+        return None
+    values = [_encode_cursor_value(rows[-1][column]) for column in columns]
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str, expected_len: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != expected_len:
+        # Cursors from a search cannot be reused for plain listing and vice versa.
+        raise ValueError("Cursor does not match this query")
+    return [_decode_cursor_value(value) for value in values]
+
+
+def _plan_rows(plan: Any) -> int:
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    # Smallest string (in code point order) greater than every string starting with prefix.
+    chars = list(prefix)
+    while chars:
+        last = ord(chars[-1])
+        if last < 0x10FFFF:
+            chars[-1] = chr(last + 1)
+            return "".join(chars)
+        chars.pop()
+    return None
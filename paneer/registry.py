@@ -0,0 +1,74 @@
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+class Registry:
+    """Process-wide home for expensive components: models, clients and stores.
+
+    Each component is built at most once, on first use or by a background warmup, and every
+    caller shares the same instance. A failed build is not cached, so the next get() retries.
+    """
+
+    def __init__(self) -> None:
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._warm: List[str] = []
+        self._instances: Dict[str, Any] = {}
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any], warm: bool = True) -> None:
+        with self._lock:
+            self._factories[name] = factory
+            self._locks[name] = threading.Lock()
+            self._status[name] = {"state": "pending"}
+            if warm:
+                self._warm.append(name)
+
+    def get(self, name: str) -> Any:
+        if name in self._instances:
+            return self._instances[name]
+        with self._locks[name]:
+            if name in self._instances:
+                return self._instances[name]
+            self._status[name] = {"state": "loading"}
+            start = time.perf_counter()
+            try:
+                instance = self._factories[name]()
+            except Exception as e:
+                self._status[name] = {"state": "failed", "error": str(e), "seconds": round(time.perf_counter() - start, 3)}
+                raise
+            self._instances[name] = instance
+            self._status[name] = {"state": "ready", "seconds": round(time.perf_counter() - start, 3)}
+            return instance
+
+    def peek(self, name: str) -> Optional[Any]:
+        # Never triggers a build; used by stats endpoints.
+        return self._instances.get(name)
+
+    def warmup(self, names: Optional[Sequence[str]] = None) -> threading.Thread:
+        names = list(names or self._warm)
+
+        def run():
+            start = time.perf_counter()
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"Warmup: failed to build {name}: {e}")
+            print(f"Warmup finished in {time.perf_counter() - start:.1f}s")
+
+        thread = threading.Thread(target=run, name="registry-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict[str, Any]:
+        components = {name: dict(status) for name, status in self._status.items()}
+        return {
+            "ready": all(components[name]["state"] == "ready" for name in self._warm),
+            "components": components,
+        }
+
+
+registry = Registry()
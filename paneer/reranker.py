@@ -0,0 +1,137 @@
+import os
+import threading
+from typing import List, Sequence, Tuple
+import numpy as np
+
+RERANKER_MODEL_NAME = os.getenv("RERANKER_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# "torch" (sentence-transformers CrossEncoder) or "onnx" (int8-quantized ONNX Runtime).
+RERANKER_BACKEND = os.getenv("RERANKER_BACKEND", "torch").lower()
+# Query + 2000-char parent is ~450 tokens; lowering this trades ranking quality for latency.
+RERANKER_MAX_LENGTH = int(os.getenv("RERANKER_MAX_LENGTH", 512))
+RERANKER_BATCH_SIZE = int(os.getenv("RERANKER_BATCH_SIZE", 32))
+RERANKER_ONNX_DIR = os.getenv(
+    "RERANKER_ONNX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "onnx")
+)
+RERANKER_THREADS = int(os.getenv("RERANKER_THREADS", 0))
+
+
+class TorchReranker:
+    """The sentence-transformers CrossEncoder in full precision."""
+
+    backend = "torch"
+
+    def __init__(self, model_name: str = RERANKER_MODEL_NAME, max_length: int = RERANKER_MAX_LENGTH, batch_size: int = RERANKER_BATCH_SIZE) -> None:
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.model = CrossEncoder(model_name, max_length=max_length)
+
+    def predict(self, pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+        import torch
+
+        if not pairs:
+            return np.zeros(0, dtype=np.float32)
+        # Raw logits, like the ONNX backend, so scores from both are directly comparable.
+        scores = self.model.predict(
+            list(pairs), batch_size=self.batch_size, activation_fn=torch.nn.Identity(), show_progress_bar=False
+        )
+        return np.asarray(scores, dtype=np.float32).reshape(-1)
+
+
+class OnnxReranker:
+    """The same cross-encoder exported to ONNX with dynamically quantized int8 weights.
+
+    The export and quantization run once and are cached under RERANKER_ONNX_DIR.
+    """
+
+    backend = "onnx"
+
+    def __init__(
+        self,
+        model_name: str = RERANKER_MODEL_NAME,
+        max_length: int = RERANKER_MAX_LENGTH,
+        batch_size: int = RERANKER_BATCH_SIZE,
+        cache_dir: str = RERANKER_ONNX_DIR,
+        threads: int = RERANKER_THREADS,
+    ) -> None:
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.model_dir = os.path.join(cache_dir, model_name.replace("/", "__"))
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+        model_path = os.path.join(self.model_dir, "model_int8.onnx")
+        if not os.path.exists(model_path):
+            self._export(model_path)
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def _export(self, model_path: str) -> None:
+        import torch
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        from transformers import AutoModelForSequenceClassification
+
+        os.makedirs(self.model_dir, exist_ok=True)
+        # Per-process temporary names: several API workers may start exporting at the same time.
+        fp32_path = os.path.join(self.model_dir, f"model.{os.getpid()}.onnx")
+        model = AutoModelForSequenceClassification.from_pretrained(self.model_name).eval()
+        sample = self.tokenizer([("query", "passage")], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+                dynamo=False,
+            )
+        tmp_path = f"{model_path}.{os.getpid()}.tmp"
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, model_path)
+        os.remove(fp32_path)
+
+    def predict(self, pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+        scores: List[np.ndarray] = []
+        for start in range(0, len(pairs), self.batch_size):
+            batch = pairs[start:start + self.batch_size]
+            encoded = self.tokenizer(
+                [q for q, _ in batch],
+                [p for _, p in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            feed = {name: value.astype(np.int64) for name, value in encoded.items() if name in self._input_names}
+            logits = self.session.run(["logits"], feed)[0]
+            scores.append(logits[:, 0].astype(np.float32))
+        return np.concatenate(scores) if scores else np.zeros(0, dtype=np.float32)
+
+
+_BACKENDS = {"torch": TorchReranker, "onnx": OnnxReranker}
+_lock = threading.Lock()
+
+
+def create_reranker(backend: str = RERANKER_BACKEND, **kwargs):
+    if backend not in _BACKENDS:
+        raise ValueError(f"Unknown reranker backend {backend!r}; expected one of {sorted(_BACKENDS)}")
+    if backend == "onnx":
+        # Threads of one worker share a single export.
+        with _lock:
+            return OnnxReranker(**kwargs)
+    return _BACKENDS[backend](**kwargs)
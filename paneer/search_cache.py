@@ -0,0 +1,176 @@
+import re
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+
+CORPUS_VERSION_KEY = "corpus:version"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCT_RE = re.compile(r"^[\W_]+|[\W_]+$")
+
+
+def normalize_query(query: str) -> str:
+    # "Mess fee?" and "  mess   FEE" share one entry.
+    return _EDGE_PUNCT_RE.sub("", _WHITESPACE_RE.sub(" ", query).strip().lower())
+
+
+def bump_corpus_version(redis_client) -> Optional[int]:
+    # Every cached search result is keyed by this counter, so bumping it retires them all at once.
+    try:
+        return int(redis_client.incr(CORPUS_VERSION_KEY))
+    except Exception as e:
+        logging.warning(f"Search cache: failed to bump corpus version: {e}")
+        return None
+
+
+class SearchCacheKey(NamedTuple):
+    version: int
+    digest: str
+    vector: Optional[np.ndarray]
+
+
+class SearchResultCache:
+    """Redis cache of formatted search results keyed by normalized query and corpus version.
+
+    With an embeddings model and a similarity threshold, a query that misses exactly can still
+    reuse the result of a previously seen query whose embedding is close enough. Candidate
+    embeddings are appended to a Redis list per corpus version, capped at max_neighbours, and
+    mirrored in an in-process matrix that only fetches entries it has not seen yet.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        ttl_seconds: int = 3600,
+        embeddings=None,
+        similarity_threshold: Optional[float] = None,
+        max_neighbours: int = 1000,
+        namespace: str = "search",
+    ) -> None:
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.max_neighbours = max_neighbours
+        self.namespace = namespace
+
+        self._lock = threading.Lock()
+        # (version, digests, matrix) of the neighbours this process has loaded so far.
+        self._neighbours: Tuple[int, List[str], np.ndarray] = (-1, [], np.empty((0, 0), dtype=np.float32))
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @property
+    def near_duplicates_enabled(self) -> bool:
+        return self.embeddings is not None and self.similarity_threshold is not None
+
+    def _result_key(self, version: int, digest: str) -> str:
+        return f"{self.namespace}:v{version}:{digest}"
+
+    def _neighbours_key(self, version: int) -> str:
+        return f"{self.namespace}:v{version}:neighbours"
+
+    def _count(self, attr: str) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def _sync_neighbours(self, version: int) -> Tuple[List[str], np.ndarray]:
+        # Entries are only ever appended (until the cap), so LLEN says whether anything is new.
+        with self._lock:
+            local_version, digests, matrix = self._neighbours
+        key = self._neighbours_key(version)
+        length = self.redis_client.llen(key)
+        if local_version != version or length < len(digests):
+            # A new corpus version, or the list expired and started over.
+            local_version, digests, matrix = -1, [], np.empty((0, 0), dtype=np.float32)
+        entries = self.redis_client.lrange(key, len(digests), -1) if length > len(digests) else []
+        if entries:
+            # Each entry is a 64 character hex digest followed by the float32 vector.
+            rows = np.stack([np.frombuffer(entry[64:], dtype=np.float32) for entry in entries])
+            digests = digests + [entry[:64].decode() for entry in entries]
+            matrix = np.vstack([matrix, rows]) if matrix.size else rows
+        if entries or local_version != version:
+            with self._lock:
+                self._neighbours = (version, digests, matrix)
+        return digests, matrix
+
+    def _nearest(self, version: int, vector: np.ndarray) -> Optional[str]:
+        digests, matrix = self._sync_neighbours(version)
+        if not digests:
+            return None
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        return digests[best]
+
+    def lookup(self, query: str, filters: Optional[Dict[str, Optional[str]]] = None) -> Tuple[Optional[str], Optional[SearchCacheKey]]:
+        """Returns (cached result or None, key to store a fresh result under)."""
+        # Exact-match filters are matched case-insensitively; URL prefixes are not.
+        filters = {
+            k: v.strip() if k == "source_url_prefix" else v.strip().lower()
+            for k, v in (filters or {}).items() if v and v.strip()
+        }
+        try:
+            version = int(self.redis_client.get(CORPUS_VERSION_KEY) or 0)
+            cache_input = normalize_query(query)
+            if filters:
+                cache_input += "\0" + json.dumps(filters, sort_keys=True)
+            digest = hashlib.sha256(cache_input.encode("utf-8")).hexdigest()
+            cached = self.redis_client.get(self._result_key(version, digest))
+            if cached is not None:
+                self._count("hits")
+                return cached.decode("utf-8"), SearchCacheKey(version, digest, None)
+
+            vector = None
+            # Near-duplicate matching only covers unfiltered searches; a neighbour may have used other filters.
+            if self.near_duplicates_enabled and not filters:
+                vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+                vector /= np.linalg.norm(vector) or 1.0
+                neighbour = self._nearest(version, vector)
+                if neighbour is not None:
+                    cached = self.redis_client.get(self._result_key(version, neighbour))
+                    if cached is not None:
+                        self._count("near_hits")
+                        return cached.decode("utf-8"), SearchCacheKey(version, digest, None)
+        except Exception as e:
+            logging.warning(f"Search cache: lookup failed: {e}")
+            return None, None
+
+        self._count("misses")
+        return None, SearchCacheKey(version, digest, vector)
+
+    def store(self, key: Optional[SearchCacheKey], result: str) -> None:
+        # The key carries the version read before retrieval ran, so a result computed while the
+        # corpus changed is filed under the old version and never served.
+        if key is None:
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.set(self._result_key(key.version, key.digest), result.encode("utf-8"), ex=self.ttl_seconds)
+            if key.vector is not None:
+                neighbours_key = self._neighbours_key(key.version)
+                # RPUSH and LTRIM run as one transaction, so the list never outgrows the cap;
+                # entries past it are dropped and the first max_neighbours stay put.
+                transaction = self.redis_client.pipeline(transaction=True)
+                transaction.rpush(neighbours_key, key.digest.encode() + key.vector.tobytes())
+                transaction.ltrim(neighbours_key, 0, self.max_neighbours - 1)
+                transaction.expire(neighbours_key, self.ttl_seconds)
+                transaction.execute()
+            pipe.execute()
+        except Exception as e:
+            logging.warning(f"Search cache: store failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+            }
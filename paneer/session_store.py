@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from typing import Callable, List, NamedTuple, Optional, Tuple
+import ormsgpack
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and the NIT Trichy assistant. "
+    "Merge the new turns into the current summary. Keep names, numbers, dates, the topics the user asked "
+    "about and any facts the assistant gave. Drop greetings and repetition. Reply with the summary only, "
+    "in at most {max_words} words."
+)
+
+
+def heuristic_token_count(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def load_token_counter(tokenizer_name: Optional[str]) -> Callable[[str], int]:
+    """Counts tokens with a Hugging Face tokenizer, or about four characters per token without one."""
+    if tokenizer_name:
+        try:
+            from tokenizers import Tokenizer
+
+            tokenizer = Tokenizer.from_pretrained(tokenizer_name)
+            tokenizer.no_truncation()
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+        except Exception as e:
+            logging.warning(f"Session store: could not load tokenizer {tokenizer_name} ({e}), estimating tokens from length.")
+    return heuristic_token_count
+
+
+class Turn(NamedTuple):
+    number: int
+    user: str
+    assistant: str
+    tokens: int
+
+
+class SessionStore:
+    """Chat history kept in Redis as an append-only list of turns plus a rolling summary.
+
+    Each turn is one msgpack entry carrying its own token count, so a turn costs one RPUSH and
+    loading the prompt history never re-tokenizes. load() returns the summary and as many recent
+    turns as fit in history_token_budget. Turns that no longer fit are folded into the summary
+    in the background and then removed from the list, so the list only ever holds turns the
+    summary does not cover yet. max_turns caps it in case summarizing keeps failing.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        summarizer=None,
+        count_tokens: Callable[[str], int] = heuristic_token_count,
+        history_token_budget: int = 2000,
+        summary_max_tokens: int = 300,
+        summary_min_turns: int = 1,
+        max_turns: int = 200,
+        ttl_seconds: int = 86400,
+        namespace: str = "session",
+    ) -> None:
+        self.redis_client = redis_client
+        self.summarizer = summarizer
+        self.count_tokens = count_tokens
+        self.history_token_budget = history_token_budget
+        self.summary_max_tokens = summary_max_tokens
+        self.summary_min_turns = summary_min_turns
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self._tasks = set()
+
+    def _keys(self, session_id: str):
+        base = f"{self.namespace}:{session_id}"
+        return f"{base}:turns", f"{base}:seq", f"{base}:summary", f"{base}:summary_lock"
+
+    async def append(self, session_id: str, user: str, assistant: str) -> None:
+        turns_key, seq_key, summary_key, _ = self._keys(session_id)
+        number = await self.redis_client.incr(seq_key)
+        tokens = self.count_tokens(user) + self.count_tokens(assistant)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.rpush(turns_key, ormsgpack.packb([number, user, assistant, tokens]))
+        pipe.ltrim(turns_key, -self.max_turns, -1)
+        for key in (turns_key, seq_key, summary_key):
+            pipe.expire(key, self.ttl_seconds)
+        await pipe.execute()
+
+    async def _read(self, session_id: str) -> Tuple[str, int, List[Tuple[bytes, Turn]]]:
+        turns_key, _, summary_key, _ = self._keys(session_id)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.lrange(turns_key, 0, -1)
+        pipe.hgetall(summary_key)
+        raw_turns, raw_summary = await pipe.execute()
+        summary = raw_summary.get(b"text", b"").decode("utf-8")
+        summarized_upto = int(raw_summary.get(b"upto", 0))
+        # A turn whose removal failed after it was summarized is skipped here.
+        turns = [(raw, Turn(*ormsgpack.unpackb(raw))) for raw in raw_turns]
+        turns = sorted((item for item in turns if item[1].number > summarized_upto), key=lambda item: item[1].number)
+        return summary, summarized_upto, turns
+
+    def _split(self, summary: str, turns: List[Tuple[bytes, Turn]]):
+        # Newest turns that fit the budget stay verbatim; everything older is due for the summary.
+        budget = self.history_token_budget - (self.count_tokens(summary) if summary else 0)
+        keep = 0
+        for _, turn in reversed(turns):
+            if turn.tokens > budget:
+                break
+            budget -= turn.tokens
+            keep += 1
+        return turns[:len(turns) - keep], turns[len(turns) - keep:]
+
+    async def load(self, session_id: str) -> List[BaseMessage]:
+        summary, _, turns = await self._read(session_id)
+        pending, recent = self._split(summary, turns)
+        if self.summarizer and pending and len(pending) >= self.summary_min_turns:
+            self._schedule_summary(session_id)
+
+        messages: List[BaseMessage] = []
+        if summary:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+        for _, turn in recent:
+            messages.append(HumanMessage(content=turn.user))
+            messages.append(AIMessage(content=turn.assistant))
+        return messages
+
+    def _schedule_summary(self, session_id: str) -> None:
+        # Keep a reference so the task is not garbage collected mid-flight.
+        task = asyncio.create_task(self._summarize(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, session_id: str) -> None:
+        turns_key, _, summary_key, lock_key = self._keys(session_id)
+        # One summarizer per session at a time; turns left over are picked up by the next load().
+        if not await self.redis_client.set(lock_key, b"1", nx=True, ex=120):
+            return
+        try:
+            # Read again under the lock: another summarizer may have moved the summary on since load().
+            summary, _, turns = await self._read(session_id)
+            pending, _ = self._split(summary, turns)
+            if not pending:
+                return
+            transcript = "\n\n".join(f"User: {turn.user}\nAssistant: {turn.assistant}" for _, turn in pending)
+            prompt = [
+                SystemMessage(content=SUMMARY_PROMPT.format(max_words=int(self.summary_max_tokens * 0.75))),
+                HumanMessage(content=f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"),
+            ]
+            response = await self.summarizer.ainvoke(prompt)
+            text = str(response.content).strip()
+            tokens = self.count_tokens(text)
+            if tokens > self.summary_max_tokens:
+                text = text[:len(text) * self.summary_max_tokens // tokens]
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(summary_key, mapping={"text": text, "upto": pending[-1][1].number})
+            pipe.expire(summary_key, self.ttl_seconds)
+            # Removed by value, so turns appended meanwhile are untouched.
+            for raw, _ in pending:
+                pipe.lrem(turns_key, 1, raw)
+            await pipe.execute()
+        except Exception as e:
+            logging.warning(f"Session store: failed to summarize session {session_id}: {e}")
+        finally:
+            await self.redis_client.delete(lock_key)
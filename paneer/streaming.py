@@ -0,0 +1,189 @@
+import time
+import asyncio
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import orjson
+
+THINKING = "thought"
+TEXT = "text"
+
+FRAME_TYPES = {THINKING: "thought_chunk", TEXT: "text_chunk"}
+
+T = TypeVar("T")
+
+
+def _tag_automaton(tag: str) -> List[Dict[str, int]]:
+    # KMP automaton: transitions[m][c] is the length of the longest tag prefix that ends the text
+    # after c follows a match of m characters. Characters outside the tag always go back to 0.
+    fail = [0] * len(tag)
+    for i in range(1, len(tag)):
+        k = fail[i - 1]
+        while k and tag[i] != tag[k]:
+            k = fail[k - 1]
+        fail[i] = k + 1 if tag[i] == tag[k] else 0
+    transitions: List[Dict[str, int]] = []
+    for m in range(len(tag)):
+        row = {}
+        for c in set(tag):
+            if tag[m] == c:
+                row[c] = m + 1
+            elif m:
+                row[c] = transitions[fail[m - 1]].get(c, 0)
+        transitions.append(row)
+    return transitions
+
+
+class ThinkingTagParser:
+    """Splits streamed model output into thought and answer segments on <thinking> tags.
+
+    feed() takes fragments of any size, including ones that cut a tag in half, and returns
+    (kind, text) segments with kind THINKING or TEXT. Only a partially matched tag is held back,
+    and each character is looked at once. Call flush() when the stream ends.
+    """
+
+    OPEN_TAG = "<thinking>"
+    CLOSE_TAG = "</thinking>"
+
+    _automata = {OPEN_TAG: _tag_automaton(OPEN_TAG), CLOSE_TAG: _tag_automaton(CLOSE_TAG)}
+
+    def __init__(self) -> None:
+        self.thinking = False
+        self._matched = 0
+
+    def _tag(self) -> str:
+        return self.CLOSE_TAG if self.thinking else self.OPEN_TAG
+
+    def _kind(self) -> str:
+        return THINKING if self.thinking else TEXT
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        segments: List[Tuple[str, str]] = []
+        run: List[str] = []
+        tag = self._tag()
+        automaton = self._automata[tag]
+        i, n = 0, len(text)
+        while i < n:
+            if not self._matched:
+                # Outside a partial match, everything up to the next possible tag start is plain text.
+                j = text.find(tag[0], i)
+                if j < 0:
+                    run.append(text[i:])
+                    break
+                if j > i:
+                    run.append(text[i:j])
+                i = j
+            c = text[i]
+            i += 1
+            matched = automaton[self._matched].get(c, 0)
+            if matched == len(tag):
+                if run:
+                    segments.append((self._kind(), "".join(run)))
+                    run = []
+                self.thinking = not self.thinking
+                self._matched = 0
+                tag = self._tag()
+                automaton = self._automata[tag]
+                continue
+            # Characters that fell out of the partial match are ordinary text after all.
+            released = self._matched + 1 - matched
+            if released:
+                run.append((tag[:self._matched] + c)[:released])
+            self._matched = matched
+        if run:
+            segments.append((self._kind(), "".join(run)))
+        return segments
+
+    def flush(self) -> List[Tuple[str, str]]:
+        # An unfinished tag at the end of the stream is emitted as text.
+        held = self._tag()[:self._matched]
+        self._matched = 0
+        return [(self._kind(), held)] if held else []
+
+
+def encode_frame(payload: dict) -> bytes:
+    return orjson.dumps(payload) + b"\n"
+
+
+class FrameCoalescer:
+    """Merges consecutive text or thought chunks into fewer NDJSON frames.
+
+    Pending content goes out once it reaches max_chars or has waited max_delay_ms. The wait is
+    checked as new content arrives; paced() also enforces it while the source is stalled. Any
+    other event, and flush(), sends pending content first, so frame order is preserved.
+    """
+
+    def __init__(self, max_chars: int = 256, max_delay_ms: float = 40, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_chars = max_chars
+        self.max_delay = max_delay_ms / 1000
+        self.clock = clock
+        self._kind: Optional[str] = None
+        self._parts: List[str] = []
+        self._size = 0
+        self._since = 0.0
+
+    def add(self, kind: str, text: str) -> List[bytes]:
+        if not text:
+            return []
+        frames = self.flush() if kind != self._kind else []
+        if not self._parts:
+            self._kind, self._since = kind, self.clock()
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.max_chars or self.clock() - self._since >= self.max_delay:
+            frames.extend(self.flush())
+        return frames
+
+    def add_segments(self, segments: List[Tuple[str, str]]) -> List[bytes]:
+        frames: List[bytes] = []
+        for kind, text in segments:
+            frames.extend(self.add(kind, text))
+        return frames
+
+    def time_until_due(self) -> Optional[float]:
+        """Seconds until pending content must go out, or None when nothing is pending."""
+        if not self._parts:
+            return None
+        return max(0.0, self._since + self.max_delay - self.clock())
+
+    def event(self, payload: dict) -> List[bytes]:
+        return self.flush() + [encode_frame(payload)]
+
+    def flush(self) -> List[bytes]:
+        if not self._parts:
+            return []
+        frame = encode_frame({"type": FRAME_TYPES[self._kind], "content": "".join(self._parts)})
+        self._kind, self._parts, self._size = None, [], 0
+        return [frame]
+
+
+async def paced(source: AsyncIterator[T], frames: FrameCoalescer) -> AsyncIterator[Tuple[Optional[T], List[bytes]]]:
+    """Iterates source, waking up when the coalescer's pending content is due.
+
+    Yields (item, []) for every item, and (None, frames) when pending content timed out while the
+    source was stalled, e.g. while the model prepares a tool call. The pending __anext__ is waited
+    on rather than cancelled at the deadline, so the stream itself is never interrupted.
+    """
+    iterator = source.__aiter__()
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=frames.time_until_due())
+            if not done:
+                yield None, frames.flush()
+                continue
+            try:
+                item = pending.result()
+            except StopAsyncIteration:
+                return
+            finally:
+                pending = None
+            yield item, []
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import chromadb
+from dotenv import load_dotenv
+from local_vector_index import LocalVectorIndex, LOCAL_VECTOR_INDEX_PATH, LOCAL_VECTOR_INDEX_DTYPE
+
+load_dotenv()
+
+CHROMA_HOST = os.getenv('CHROMA_HOST', "localhost")
+CHROMA_PORT = int(os.getenv('CHROMA_PORT', 8001))
+
+
+def sync(collection_name, path, dtype, batch_size):
+    # Copies the stored embeddings as they are; nothing is re-embedded.
+    client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+    collection = client.get_collection(collection_name)
+    total = collection.count()
+    print(f"Importing {total} chunks from Chroma collection '{collection_name}' into {path} ({dtype})...")
+
+    ids, embeddings, documents, metadatas = [], [], [], []
+    start = time.perf_counter()
+    offset = 0
+    while True:
+        batch = collection.get(limit=batch_size, offset=offset, include=["embeddings", "documents", "metadatas"])
+        if not batch["ids"]:
+            break
+        ids.extend(batch["ids"])
+        embeddings.append(np.asarray(batch["embeddings"], dtype=np.float32))
+        documents.extend(batch["documents"])
+        metadatas.extend(batch["metadatas"])
+        offset += len(batch["ids"])
+        print(f"  {offset}/{total}")
+
+    # The embedding function is only needed for queries, which this script never runs.
+    index = LocalVectorIndex(embedding_function=None, path=path, dtype=dtype)
+    index.replace_all(ids, np.concatenate(embeddings) if embeddings else [], documents, metadatas)
+    print(f"Done: {index.count()} chunks in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the local vector index from the Chroma collection.")
+    parser.add_argument("--collection", default="nitt_data")
+    parser.add_argument("--path", default=LOCAL_VECTOR_INDEX_PATH)
+    parser.add_argument("--dtype", default=LOCAL_VECTOR_INDEX_DTYPE, choices=["float32", "int8"])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    try:
+        sync(args.collection, args.path, args.dtype, args.batch_size)
+    except Exception as e:
+        sys.exit(f"Sync failed: {e}")
@@ -0,0 +1,56 @@
+import uuid
+import datetime
+from enum import Enum
+from langchain_core.documents import Document
+from langchain_core.load import dumps
+from docstore_codec import decode_document, encode_document, is_compact
+
+
+class Audience(str, Enum):
+    STUDENT = "student"
+
+
+def roundtrip(metadata):
+    data = encode_document(Document(page_content="Hostel fees", metadata=metadata, id="doc-1"))
+    return data, decode_document(data)
+
+
+def test_plain_metadata_round_trips_compactly():
+    metadata = {"title": "Fees", "tags": ["a", "b"], "page": 3, "score": 0.5, "draft": None, "nested": {"k": True}}
+    data, doc = roundtrip(metadata)
+    assert is_compact(data)
+    assert doc.metadata == metadata and doc.page_content == "Hostel fees" and doc.id == "doc-1"
+
+
+def test_large_documents_are_compressed_and_round_trip():
+    content = "mess menu " * 500
+    data = encode_document(Document(page_content=content))
+    assert is_compact(data) and len(data) < len(content)
+    assert decode_document(data).page_content == content
+
+
+def test_datetimes_dates_and_uuids_keep_their_types():
+    metadata = {
+        "crawled_at": datetime.datetime(2024, 1, 1, 9, 30, 15, 123456),
+        "updated_at": datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone(datetime.timedelta(hours=5, minutes=30))),
+        "published": datetime.date(2023, 12, 31),
+        "source_id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    }
+    data, doc = roundtrip(metadata)
+    assert is_compact(data)
+    assert doc.metadata == metadata
+    assert type(doc.metadata["crawled_at"]) is datetime.datetime and type(doc.metadata["published"]) is datetime.date
+
+
+def test_types_msgpack_would_change_fall_back_to_the_legacy_format():
+    for value in [(1, 2), Audience.STUDENT]:
+        document = Document(page_content="x", metadata={"value": value})
+        data = encode_document(document)
+        assert not is_compact(data)
+        assert data == dumps(document).encode("utf-8")
+
+
+def test_legacy_rows_still_decode():
+    document = Document(page_content="old row", metadata={"title": "Fees"}, id="doc-2")
+    doc = decode_document(dumps(document).encode("utf-8"))
+    assert (doc.page_content, doc.metadata, doc.id) == ("old row", {"title": "Fees"}, "doc-2")
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import pytest
+from groq_pool import GroqKeyPool, RequestTooLarge
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class ThreadRecordingRedis(fakeredis.FakeRedis):
+    """Notes which threads issue Redis commands, to catch round-trips made on the event loop."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = set()
+
+    def execute_command(self, *args, **kwargs):
+        self.threads.add(threading.get_ident())
+        return super().execute_command(*args, **kwargs)
+
+    def pipeline(self, *args, **kwargs):
+        self.threads.add(threading.get_ident())
+        return super().pipeline(*args, **kwargs)
+
+
+def make_pool(redis_client=None, **kwargs):
+    return GroqKeyPool(["key-a", "key-b"], model_name="test-model", redis_client=redis_client, **kwargs)
+
+
+def test_async_paths_keep_redis_off_the_event_loop():
+    redis_client = ThreadRecordingRedis()
+    pool = make_pool(redis_client)
+
+    async def run():
+        loop_thread = threading.get_ident()
+        first = await pool.aacquire(300)
+        second = await pool.atry_acquire(300, exclude=[first])
+        await pool.arelease(first, RateLimited("429 Too Many Requests"))
+        await pool.aobserve_headers(second, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2s"})
+        await pool.arelease(second)
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(run())
+    assert {first, second} == {0, 1}
+    assert redis_client.threads and loop_thread not in redis_client.threads
+    assert all(key["in_flight"] == 0 for key in pool.stats()["keys"])
+    # Both cooldowns reached Redis, where other processes see them.
+    for state in pool.keys:
+        assert redis_client.pttl(pool._redis_key(state, "cooldown")) > 0
+
+
+def test_cooldowns_are_shared_between_pools_of_the_same_model_only():
+    server = fakeredis.FakeServer()
+    worker = make_pool(fakeredis.FakeRedis(server=server))
+    crawler = make_pool(fakeredis.FakeRedis(server=server))
+    other_model = GroqKeyPool(["key-a", "key-b"], model_name="other-model", redis_client=fakeredis.FakeRedis(server=server))
+
+    asyncio.run(worker.acooldown(0, 30))
+    assert crawler.try_acquire(300) == 1
+    assert other_model.try_acquire(300) == 0
+
+
+def test_oversized_requests_fail_fast():
+    pool = make_pool(tokens_per_minute=1000)
+    with pytest.raises(RequestTooLarge):
+        asyncio.run(pool.aacquire(1001))
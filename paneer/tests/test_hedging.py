@@ -0,0 +1,113 @@
+import time
+import socket
+import asyncio
+import threading
+import pytest
+
+pytest.importorskip("langchain_groq")
+uvicorn = pytest.importorskip("uvicorn")
+httpx = pytest.importorskip("httpx")
+
+import utils
+import groq_pool
+from groq_pool import GroqKeyPool
+from fake_llm_server import create_app
+
+# Hedged streaming against fake_llm_server: each key's time to first token is pinned, so which
+# request wins is known in advance.
+
+SLOW_TTFT = 1.0
+PROFILES = {
+    "slow": {"ttft": SLOW_TTFT, "inter_token": 0.005, "text": "slow answer"},
+    "fast": {"ttft": 0.05, "inter_token": 0.005, "text": "fast answer"},
+    "limited": {"rate_limited": True},
+}
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(PROFILES), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join()
+
+
+@pytest.fixture
+def groq(server_url, monkeypatch):
+    monkeypatch.setenv("GROQ_API_BASE", server_url)
+    monkeypatch.setattr(groq_pool, "GROQ_HEDGE_DEFAULT_DELAY_MS", 300)
+    monkeypatch.setattr(groq_pool, "GROQ_HEDGE_MIN_DELAY_MS", 100)
+    httpx.post(f"{server_url}/stats/reset")
+
+    def server_stats():
+        # Give the server a moment to notice cancelled streams.
+        time.sleep(0.2)
+        return httpx.get(f"{server_url}/stats").json()
+
+    return server_stats
+
+
+def run_stream(keys, monkeypatch, hedge=True):
+    monkeypatch.setattr(utils, "GROQ_HEDGE_ENABLED", hedge)
+    pool = GroqKeyPool(keys, model_name="llama-3.1-8b-instant")
+    llm = utils.RotatingGroqChat(keys, pool=pool)
+
+    async def run():
+        start = time.monotonic()
+        ttft, text = None, ""
+        async for chunk in llm.astream("What is the hostel fee?"):
+            if ttft is None:
+                ttft = time.monotonic() - start
+            text += chunk.content
+        return ttft, text
+
+    ttft, text = asyncio.run(run())
+    return ttft, text, pool
+
+
+def test_without_hedging_the_slow_key_is_awaited(groq, monkeypatch):
+    ttft, text, _ = run_stream(["slow", "fast"], monkeypatch, hedge=False)
+    assert ttft >= SLOW_TTFT * 0.9 and text == "slow answer"
+
+
+def test_hedge_wins_on_the_fast_key_and_cancels_the_loser(groq, monkeypatch):
+    ttft, text, pool = run_stream(["slow", "fast"], monkeypatch)
+    stats = groq()
+    assert ttft < SLOW_TTFT * 0.6 and text == "fast answer"
+    assert pool.hedges == 1 and pool.hedge_wins == 1
+    assert stats["cancelled"].get("slow") == 1 and stats["completed"].get("fast") == 1
+    keys = pool.stats()["keys"]
+    assert [key["in_flight"] for key in keys] == [0, 0]
+    # The loser's cut-short wait is counted, never recorded as a TTFT that would make it look fast.
+    assert pool.keys[0].ttft.total == 0 and keys[0]["ttft_censored"] == 1
+    assert pool.keys[1].ttft.total == 1 and keys[1]["ttft_censored"] == 0
+
+
+def test_fast_primary_is_not_hedged(groq, monkeypatch):
+    _, text, pool = run_stream(["fast", "slow"], monkeypatch)
+    stats = groq()
+    assert text == "fast answer" and pool.hedges == 0
+    assert "slow" not in stats["requests"]
+
+
+def test_rate_limited_key_fails_over_and_cools_down(groq, monkeypatch):
+    _, text, pool = run_stream(["limited", "fast"], monkeypatch)
+    assert text == "fast answer"
+    assert pool.stats()["keys"][0]["cooldown_seconds"] > 0
+
+
+def test_deadline_follows_the_keys_ttft_histogram():
+    pool = GroqKeyPool(["a", "b"])
+    assert pool.hedge_delay(0) == groq_pool.GROQ_HEDGE_DEFAULT_DELAY_MS / 1000
+    for _ in range(40):
+        pool.record_ttft(0, 0.4)
+    assert 0.4 <= pool.hedge_delay(0) <= 0.5
+    # Key 1 has too few samples of its own and borrows the pool-wide histogram.
+    assert pool.hedge_delay(1) == pool.hedge_delay(0)
@@ -0,0 +1,61 @@
+import numpy as np
+from local_vector_index import LocalVectorIndex
+from lexical_index import LexicalIndex
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        rng = np.random.default_rng(sum(map(ord, text)))
+        return rng.standard_normal(8).tolist()
+
+
+def make_index(tmp_path, dtype="float32"):
+    index = LocalVectorIndex(FakeEmbeddings(), path=str(tmp_path / "vectors"), dtype=dtype)
+    # Three segments, with a deletion in the middle one.
+    for start in (0, 4, 8):
+        texts = [f"chunk {i}" for i in range(start, start + 4)]
+        index.add_texts(texts, [{"doc_id": f"doc-{i // 2}", "n": i} for i in range(start, start + 4)], ids=[f"c{i}" for i in range(start, start + 4)])
+    index.delete(ids=["c5"])
+    return index
+
+
+def test_get_pages_across_segments_in_insertion_order(tmp_path):
+    index = make_index(tmp_path)
+    expected = [f"c{i}" for i in range(12) if i != 5]
+    assert index.get()["ids"] == expected
+    for limit in (1, 3, 4, 5):
+        pages = [index.get(limit=limit, offset=offset)["ids"] for offset in range(0, 12, limit)]
+        assert sum(pages, []) == expected
+    assert index.get(limit=2, offset=3, where={"doc_id": "doc-4"})["ids"] == []
+    assert index.get(offset=1, where={"doc_id": "doc-4"})["ids"] == ["c9"]
+    assert index.get(limit=0)["ids"] == []
+
+
+def test_get_returns_only_requested_fields(tmp_path):
+    index = make_index(tmp_path, dtype="int8")
+    result = index.get(ids=["c2"], include=["embeddings"])
+    assert set(result) == {"ids", "embeddings"}
+    expected = np.array(FakeEmbeddings().embed_query("chunk 2"))
+    # Stored vectors are normalized, and int8 rows are only approximately restored.
+    assert np.allclose(result["embeddings"][0], expected / np.linalg.norm(expected), atol=0.02)
+
+
+def test_iter_batches_walks_one_snapshot(tmp_path):
+    index = make_index(tmp_path)
+    batches = index.iter_batches(batch_size=3)
+    first = next(batches)
+    # Rows added after iteration started are not picked up half way through.
+    index.add_texts(["late"], [{"doc_id": "doc-9"}], ids=["late"])
+    ids = first["ids"] + [row for batch in batches for row in batch["ids"]]
+    assert ids == [f"c{i}" for i in range(12) if i != 5]
+    assert first["documents"] == ["chunk 0", "chunk 1", "chunk 2"]
+
+
+def test_lexical_rebuild_reads_every_chunk_once(tmp_path):
+    index = make_index(tmp_path)
+    lexical = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    assert lexical.rebuild_from_vectorstore(index, batch_size=2) == 11
+    assert [doc.metadata["n"] for doc, _ in lexical.search("chunk 7", k=20) if doc.metadata["n"] == 7] == [7]
@@ -0,0 +1,62 @@
+import os
+import uuid
+import asyncio
+import pytest
+from langchain_core.documents import Document
+from docstore_codec import decode_document, encode_document
+
+# Needs a scratch database, e.g. POSTGRES_TEST_DSN=postgresql://postgres@localhost:5432/postgres
+POSTGRES_TEST_DSN = os.getenv("POSTGRES_TEST_DSN")
+
+pytestmark = pytest.mark.skipif(not POSTGRES_TEST_DSN, reason="POSTGRES_TEST_DSN not set")
+
+AWKWARD_DOC = Document(
+    page_content="Fee structure\x00 for 2024\x00-25",
+    metadata={
+        "source_url": "https://www.nitt.edu/fees.pdf",
+        "title": ["Fee", "Structure"],
+        "content_type": "pdf\x00",
+        "page": 3,
+    },
+)
+
+
+@pytest.fixture
+def store():
+    from postgres_store import AsyncPostgresByteStore
+
+    table = f"doc_store_test_{uuid.uuid4().hex[:8]}"
+    store = AsyncPostgresByteStore(POSTGRES_TEST_DSN, table_name=table)
+    yield store
+    with store.pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+@pytest.mark.parametrize("count", [1, 1200])  # multi-row VALUES and COPY
+def test_mset_round_trips_nul_bytes_and_non_string_metadata(store, count):
+    pairs = [(f"doc-{i}", encode_document(AWKWARD_DOC)) for i in range(count)]
+    store.mset(pairs)
+
+    decoded = decode_document(store.mget(["doc-0"])[0])
+    assert decoded.page_content == AWKWARD_DOC.page_content
+    assert decoded.metadata == AWKWARD_DOC.metadata
+
+    rows, _ = store.list_documents(query="fee structure", limit=5)
+    assert rows
+    assert rows[0]["title"] is None
+    assert rows[0]["content_type"] == "pdf"
+
+
+@pytest.mark.parametrize("count", [1, 1200])
+def test_amset_round_trips_nul_bytes_and_non_string_metadata(store, count):
+    async def run():
+        try:
+            await store.amset([(f"doc-{i}", encode_document(AWKWARD_DOC)) for i in range(count)])
+            return (await store.amget(["doc-0"]))[0]
+        finally:
+            await store.aclose()
+
+    decoded = decode_document(asyncio.run(run()))
+    assert decoded.page_content == AWKWARD_DOC.page_content
+    assert decoded.metadata == AWKWARD_DOC.metadata
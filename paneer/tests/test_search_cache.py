@@ -0,0 +1,92 @@
+import threading
+import numpy as np
+import pytest
+from search_cache import SearchResultCache, bump_corpus_version
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class FakeEmbeddings:
+    # Queries mentioning the same topic word get the same direction.
+    TOPICS = ["hostel", "mess", "library", "exam"]
+
+    def embed_query(self, text):
+        vector = np.array([1.0 if topic in text.lower() else 0.0 for topic in self.TOPICS] + [0.1])
+        return (vector / np.linalg.norm(vector)).tolist()
+
+
+class CountingRedis(fakeredis.FakeRedis):
+    lranges = 0
+
+    def lrange(self, *args, **kwargs):
+        type(self).lranges += 1
+        return super().lrange(*args, **kwargs)
+
+
+def make_cache(redis_client, similarity_threshold=0.95, **kwargs):
+    return SearchResultCache(redis_client, embeddings=FakeEmbeddings(), similarity_threshold=similarity_threshold, **kwargs)
+
+
+def miss_and_store(cache, query, result):
+    cached, key = cache.lookup(query)
+    assert cached is None
+    cache.store(key, result)
+
+
+def test_exact_and_normalized_hits():
+    cache = make_cache(fakeredis.FakeRedis())
+    miss_and_store(cache, "Hostel fee?", "fees")
+    assert cache.lookup("  hostel   FEE ")[0] == "fees"
+    assert cache.lookup("hostel fee", {"audience": "Student"})[0] is None
+
+
+def test_near_duplicates_are_shared_between_processes():
+    server = fakeredis.FakeServer()
+    api_worker = make_cache(fakeredis.FakeRedis(server=server))
+    other_worker = make_cache(fakeredis.FakeRedis(server=server))
+    miss_and_store(api_worker, "hostel fee structure", "fees")
+    assert other_worker.lookup("what does the hostel cost")[0] == "fees"
+    assert other_worker.lookup("library timings")[0] is None
+    assert other_worker.near_hits == 1
+
+
+def test_neighbours_are_fetched_incrementally():
+    CountingRedis.lranges = 0
+    cache = make_cache(CountingRedis())
+    miss_and_store(cache, "hostel fee", "fees")
+    miss_and_store(cache, "mess menu", "menu")
+    # The first lookup picks up the entry stored above; later ones find nothing new.
+    assert cache.lookup("exam schedule")[0] is None
+    before = CountingRedis.lranges
+    for _ in range(5):
+        assert cache.lookup("exam schedule")[0] is None
+    assert CountingRedis.lranges == before
+    assert len(cache._neighbours[1]) == 2
+
+
+def test_neighbour_cap_holds_under_concurrent_stores():
+    redis_client = fakeredis.FakeRedis()
+    # A threshold above 1 never matches, so every lookup misses and stores a neighbour.
+    cache = make_cache(redis_client, similarity_threshold=1.01, max_neighbours=10)
+
+    def worker(offset):
+        for i in range(20):
+            _, key = cache.lookup(f"library {offset} {i}")
+            cache.store(key, "r")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert redis_client.llen(cache._neighbours_key(0)) == 10
+
+
+def test_corpus_version_bump_retires_results_and_neighbours():
+    redis_client = fakeredis.FakeRedis()
+    cache = make_cache(redis_client)
+    miss_and_store(cache, "hostel fee", "fees")
+    bump_corpus_version(redis_client)
+    assert cache.lookup("hostel fee")[0] is None
+    assert cache.lookup("hostel cost")[0] is None
+    assert cache._neighbours[0] == 1 and cache._neighbours[1] == []
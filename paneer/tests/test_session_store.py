@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from langchain_core.messages import AIMessage, SystemMessage
+from session_store import SessionStore
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class FakeSummarizer:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt[-1].content)
+        if self.fail:
+            raise RuntimeError("rate limited")
+        return AIMessage(content=f"summary #{len(self.prompts)}")
+
+
+def make_store(summarizer, budget=10):
+    # One token per character keeps the budget arithmetic obvious.
+    return SessionStore(fakeredis.FakeAsyncRedis(), summarizer=summarizer, count_tokens=len, history_token_budget=budget)
+
+
+async def settle(store):
+    while store._tasks:
+        await asyncio.gather(*store._tasks)
+
+
+def test_recent_turns_fit_the_budget_and_older_ones_are_summarized():
+    async def run():
+        summarizer = FakeSummarizer()
+        store = make_store(summarizer, budget=14)
+        for i in range(6):
+            await store.append("s", f"q{i}", f"a{i}")  # 4 tokens each
+        first = await store.load("s")
+        await settle(store)
+        remaining = await store.redis_client.llen("session:s:turns")
+        second = await store.load("s")
+        return summarizer.prompts, first, remaining, second
+
+    prompts, first, remaining, second = asyncio.run(run())
+    assert [m.content for m in first] == ["q3", "a3", "q4", "a4", "q5", "a5"]
+    assert "q0" in prompts[0] and "q2" in prompts[0] and "q3" not in prompts[0]
+    assert remaining == 3
+    # The summary now takes 10 of the 14 tokens, so only the last turn still fits verbatim.
+    assert isinstance(second[0], SystemMessage) and "summary #1" in second[0].content
+    assert [m.content for m in second[1:]] == ["q5", "a5"]
+
+
+def test_a_single_turn_outside_the_budget_is_summarized():
+    async def run():
+        summarizer = FakeSummarizer()
+        store = make_store(summarizer, budget=4)
+        await store.append("s", "q0", "a0")
+        await store.append("s", "q1", "a1")
+        await store.load("s")
+        await settle(store)
+        return summarizer.prompts
+
+    prompts = asyncio.run(run())
+    assert len(prompts) == 1 and "q0" in prompts[0]
+
+
+def test_turns_are_kept_until_a_summary_succeeds():
+    async def run():
+        summarizer = FakeSummarizer(fail=True)
+        store = make_store(summarizer, budget=10)
+        for i in range(60):
+            await store.append("s", f"q{i}", f"a{i}")
+            await store.load("s")
+            await settle(store)
+        summarizer.fail = False
+        await store.load("s")
+        await settle(store)
+        return summarizer.prompts[-1], await store.load("s")
+
+    prompt, messages = asyncio.run(run())
+    assert "User: q0\n" in prompt and "User: q57\n" in prompt
+    assert "q59" not in prompt
+    assert isinstance(messages[0], SystemMessage)
+
+
+def test_summarize_builds_on_the_summary_written_after_load():
+    async def run():
+        summarizer = FakeSummarizer()
+        store = make_store(summarizer, budget=10)
+        for i in range(4):
+            await store.append("s", f"q{i}", f"a{i}")
+        await store.load("s")
+        # Another worker summarizes turn 1 before this worker's summary task runs.
+        await store.redis_client.hset("session:s:summary", mapping={"text": "newer", "upto": 1})
+        await settle(store)
+        return summarizer.prompts
+
+    prompts = asyncio.run(run())
+    assert len(prompts) == 1
+    assert prompts[0].startswith("Current summary:\nnewer")
+    assert "q0" not in prompts[0] and "q1" in prompts[0]
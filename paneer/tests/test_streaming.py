@@ -0,0 +1,148 @@
+import asyncio
+import random
+import orjson
+import pytest
+from streaming import TEXT, THINKING, FrameCoalescer, ThinkingTagParser, paced
+
+
+def parse(chunks):
+    parser = ThinkingTagParser()
+    segments = []
+    for chunk in chunks:
+        segments.extend(parser.feed(chunk))
+    segments.extend(parser.flush())
+    merged = []
+    for kind, text in segments:
+        if merged and merged[-1][0] == kind:
+            merged[-1] = (kind, merged[-1][1] + text)
+        else:
+            merged.append((kind, text))
+    return merged
+
+
+def test_parser_splits_thinking_from_answer():
+    assert parse(["<thinking>plan</thinking>Answer"]) == [(THINKING, "plan"), (TEXT, "Answer")]
+
+
+def test_parser_handles_tags_split_at_every_position():
+    text = "Hi <thinking>look up fees</thinking>The fee is 5000."
+    expected = [(TEXT, "Hi "), (THINKING, "look up fees"), (TEXT, "The fee is 5000.")]
+    for cut in range(len(text) + 1):
+        assert parse([text[:cut], text[cut:]]) == expected
+    assert parse(list(text)) == expected
+
+
+def test_parser_releases_partial_prefixes_as_text():
+    assert parse(["a <thi", "s is not a tag"]) == [(TEXT, "a <this is not a tag")]
+    assert parse(["x <", "<thinking>t</thinking>"]) == [(TEXT, "x <"), (THINKING, "t")]
+    assert parse(["<thinking>a </", "b</thinking>"]) == [(THINKING, "a </b")]
+
+
+def test_parser_holds_back_only_the_partial_tag():
+    parser = ThinkingTagParser()
+    assert parser.feed("Answer <thin") == [(TEXT, "Answer ")]
+    assert parser.flush() == [(TEXT, "<thin")]
+
+
+def test_parser_matches_reference_split_on_random_chunkings():
+    rng = random.Random(7)
+    text = "<thinking>a<b</thin</thinking>x <<thinking> y</thinking></thinking>z<"
+    reference = parse([text])
+    for _ in range(500):
+        cuts = sorted(rng.sample(range(1, len(text)), rng.randint(1, 10)))
+        chunks = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+        assert parse(chunks) == reference
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def decode(frames):
+    return [orjson.loads(frame) for frame in frames]
+
+
+def test_coalescer_flushes_on_size():
+    frames = FrameCoalescer(max_chars=10, max_delay_ms=1000, clock=FakeClock())
+    assert frames.add(TEXT, "hello") == []
+    assert decode(frames.add(TEXT, " world")) == [{"type": "text_chunk", "content": "hello world"}]
+    assert frames.flush() == []
+
+
+def test_coalescer_flushes_on_delay_when_content_arrives():
+    clock = FakeClock()
+    frames = FrameCoalescer(max_chars=1000, max_delay_ms=40, clock=clock)
+    assert frames.add(TEXT, "a") == []
+    assert frames.time_until_due() == pytest.approx(0.04)
+    clock.now = 0.05
+    assert decode(frames.add(TEXT, "b")) == [{"type": "text_chunk", "content": "ab"}]
+    assert frames.time_until_due() is None
+
+
+def test_coalescer_keeps_order_across_kinds_and_events():
+    frames = FrameCoalescer(max_chars=1000, max_delay_ms=1000, clock=FakeClock())
+    out = frames.add(THINKING, "t1") + frames.add(THINKING, "t2") + frames.add(TEXT, "a")
+    out += frames.event({"type": "status", "content": "Searching"})
+    assert decode(out) == [
+        {"type": "thought_chunk", "content": "t1t2"},
+        {"type": "text_chunk", "content": "a"},
+        {"type": "status", "content": "Searching"},
+    ]
+
+
+def test_paced_flushes_while_the_source_stalls():
+    async def source():
+        yield "a"
+        await asyncio.sleep(0.3)
+        yield "b"
+
+    async def run():
+        frames = FrameCoalescer(max_chars=1000, max_delay_ms=20)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        events = []
+        async for item, due in paced(source(), frames):
+            if due:
+                events.append(("flush", decode(due), loop.time() - start))
+            if item is not None:
+                frames.add(TEXT, item)
+                events.append(("item", item, loop.time() - start))
+        return events, frames.flush()
+
+    events, rest = asyncio.run(run())
+    assert [event[:2] for event in events] == [
+        ("item", "a"),
+        ("flush", [{"type": "text_chunk", "content": "a"}]),
+        ("item", "b"),
+    ]
+    assert events[1][2] < 0.2
+    assert decode(rest) == [{"type": "text_chunk", "content": "b"}]
+
+
+def test_paced_closes_the_source_when_the_consumer_stops():
+    closed = []
+
+    async def source():
+        try:
+            yield 1
+            await asyncio.sleep(10)
+            yield 2
+        finally:
+            closed.append(True)
+
+    async def run():
+        frames = FrameCoalescer(max_delay_ms=10)
+        stream = paced(source(), frames)
+        async for item, due in stream:
+            if due:
+                # Stop while the source is still waiting inside __anext__.
+                break
+            frames.add(TEXT, str(item))
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert closed == [True]
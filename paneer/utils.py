@@ -2,53 +2,25 @@
 import os
 import re
 import json
+import time
+import asyncio
 import logging
-from langchain_groq import ChatGroq
+from groq_pool import GROQ_HEDGE_ENABLED, AllKeysRateLimited, estimate_tokens, get_key_pool, is_rate_limit_error
 
 class RagProcessor:
     def __init__(self, api_keys):
-        self.api_keys = api_keys
-        self.current_key_idx = 0
-        if not api_keys:
-            env_keys = os.getenv("GROQ_API_KEYS")
-            if env_keys:
-                 self.api_keys = json.loads(env_keys) if isinstance(env_keys, str) and env_keys.startswith('[') else [env_keys]
-            else:
-                 self.api_keys = []
-        
-        self.llm = self._setup_llm()
-
-    def _setup_llm(self):
-        if not self.api_keys:
-            return None
-            
-        current_key = self.api_keys[self.current_key_idx]
-        return ChatGroq(
-            api_key=current_key, 
-            model_name="meta-llama/llama-4-maverick-17b-128e-instruct", 
-            temperature=0,
-            max_retries=0
+        # Groq limits each key per model, so audits on this model never use up the chat model's budget.
+        self.llm = RotatingGroqChat(
+            api_keys,
+            model_name="meta-llama/llama-4-maverick-17b-128e-instruct",
+            temperature=0
         )
+        self.api_keys = self.llm.api_keys
 
     def _call_llm_safe(self, prompt):
-        if not self.llm:
+        if not self.api_keys:
             raise ValueError("LLM not initialized. Check GROQ_API_KEYS.")
-
-        max_attempts = len(self.api_keys) * 2 
-        
-        for attempt in range(max_attempts):
-            try:
-                return self.llm.invoke(prompt)
-            except Exception as e:
-                error_msg = str(e).lower()
-                if "429" in error_msg or "rate_limit" in error_msg:
-                    logging.warning(f"Rate Limit hit on Key #{self.current_key_idx}. Rotating...")
-                    self.current_key_idx = (self.current_key_idx + 1) % len(self.api_keys)
-                    self.llm = self._setup_llm()
-                    continue
-                else:
-                    raise e
-        raise Exception("ALL API keys are currently rate-limited or exhausted.")
+        return self.llm.invoke(prompt)
 
     def create_audit_prompt(self, doc_text, url):
         return f"""
@@ -123,13 +95,45 @@ class RagProcessor:
             }
         }
 
+_END = object()
+
+class _StreamAttempt:
+    """One streaming request pumped by its own task, so it can be raced against another and cancelled."""
+
+    def __init__(self, pool, index, stream):
+        self.pool = pool
+        self.index = index
+        self.started = time.monotonic()
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._pump(stream))
+        self.first = asyncio.ensure_future(self.queue.get())
+        self.released = False
+        self.hedge = False
+
+    async def _pump(self, stream):
+        try:
+            async for chunk in stream:
+                await self.queue.put((chunk, None))
+            await self.queue.put((_END, None))
+        except Exception as e:
+            await self.queue.put((None, e))
+
+    async def finish(self, error=None):
+        for task in (self.task, self.first):
+            task.cancel()
+        await asyncio.gather(self.task, self.first, return_exceptions=True)
+        if not self.released:
+            self.released = True
+            await self.pool.arelease(self.index, error)
+
 class RotatingGroqChat:
-    def __init__(self, api_keys, model_name="llama-3.1-8b-instant", temperature=0, tools=None):
+    """Chat model over the shared Groq key pool; each call runs on the least-loaded healthy key."""
+
+    def __init__(self, api_keys, model_name="llama-3.1-8b-instant", temperature=0, tools=None, pool=None):
         self.api_keys = list(api_keys) if api_keys else []
         self.model_name = model_name
         self.temperature = temperature
         self.tools = tools or []
-        self.current_key_idx = 0
         
         if not self.api_keys:
             env_keys = os.getenv("GROQ_API_KEYS")
@@ -141,74 +145,180 @@ class RotatingGroqChat:
                         self.api_keys = env_keys.split(',')
                  else:
                     self.api_keys = []
+
+        self.pool = pool or get_key_pool(self.api_keys, model_name)
+        self._bound = {}
     
     def bind_tools(self, tools):
         return RotatingGroqChat(
             api_keys=self.api_keys,
             model_name=self.model_name,
             temperature=self.temperature,
-            tools=tools
+            tools=tools,
+            pool=self.pool
         )
 
-    def _get_llm(self):
-        if not self.api_keys:
+    def _get_llm(self, index):
+        llm = self.pool.chat_model(index, self.temperature)
+        if not self.tools:
+            return llm
+        # Binding converts the tool schemas, so do it once per key.
+        if index not in self._bound:
+            self._bound[index] = llm.bind_tools(self.tools)
+        return self._bound[index]
+
+    def _max_attempts(self):
+        if not len(self.pool):
              raise ValueError("No Groq API keys provided.")
-             
-        current_key = self.api_keys[self.current_key_idx].strip()
-        llm = ChatGroq(
-            api_key=current_key,
-            model_name=self.model_name,
-            temperature=self.temperature,
-            max_retries=0
-        )
-        
-        if self.tools:
-            return llm.bind_tools(self.tools)
-        return llm
+        return len(self.pool) * 2
 
     def stream(self, input, config=None, **kwargs):
-        if not self.api_keys:
-             raise ValueError("No Groq API keys available to stream.")
-
-        max_attempts = len(self.api_keys) * 2
-        
-        for attempt in range(max_attempts):
+        for attempt in range(self._max_attempts()):
+            index = self.pool.acquire(estimate_tokens(input))
+            started = False
+            error = None
             try:
-                llm = self._get_llm()
-                for chunk in llm.stream(input, config=config, **kwargs):
+                for chunk in self._get_llm(index).stream(input, config=config, **kwargs):
+                    started = True
                     yield chunk
                 return
-                
             except Exception as e:
-                logging.warning(f"Error in stream attempt {attempt}: {e}")
-                error_msg = str(e).lower()
-                if "429" in error_msg or "rate_limit" in error_msg or "too many requests" in error_msg:
-                    logging.warning(f"Rate Limit hit on Key #{self.current_key_idx}. Rotating...")
-                    self.current_key_idx = (self.current_key_idx + 1) % len(self.api_keys)
-                    continue
-                else:
-                    raise e
-                    
-        raise Exception("ALL API keys are currently rate-limited or exhausted.")
+                error = e
+                logging.warning(f"Error in stream attempt {attempt} on Key #{index}: {e}")
+                # Retrying after chunks were already yielded would repeat them to the caller.
+                if not is_rate_limit_error(e) or started:
+                    raise
+            finally:
+                self.pool.release(index, error)
+        raise AllKeysRateLimited("ALL API keys are currently rate-limited or exhausted.")
 
     def invoke(self, input, config=None, **kwargs):
-        if not self.api_keys:
-             raise ValueError("No Groq API keys available to invoke.")
+        for attempt in range(self._max_attempts()):
+            index = self.pool.acquire(estimate_tokens(input))
+            error = None
+            try:
+                return self._get_llm(index).invoke(input, config=config, **kwargs)
+            except Exception as e:
+                error = e
+                logging.warning(f"Error in invoke attempt {attempt} on Key #{index}: {e}")
+                if not is_rate_limit_error(e):
+                    raise
+            finally:
+                self.pool.release(index, error)
+        raise AllKeysRateLimited("ALL API keys are currently rate-limited or exhausted.")
 
-        max_attempts = len(self.api_keys) * 2
-        
-        for attempt in range(max_attempts):
+    async def astream(self, input, config=None, **kwargs):
+        if GROQ_HEDGE_ENABLED and len(self.pool) > 1:
+            stream = self._astream_hedged(input, config, **kwargs)
+        else:
+            stream = self._astream_single(input, config, **kwargs)
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    async def _astream_single(self, input, config=None, **kwargs):
+        for attempt in range(self._max_attempts()):
+            index = await self.pool.aacquire(estimate_tokens(input))
+            start = time.monotonic()
+            started = False
+            error = None
             try:
-                llm = self._get_llm()
-                return llm.invoke(input, config=config, **kwargs)
-                
+                async for chunk in self._get_llm(index).astream(input, config=config, **kwargs):
+                    if not started:
+                        self.pool.record_ttft(index, time.monotonic() - start)
+                    started = True
+                    yield chunk
+                return
             except Exception as e:
-                logging.warning(f"Error in invoke attempt {attempt}: {e}")
-                error_msg = str(e).lower()
-                if "429" in error_msg or "rate_limit" in error_msg or "too many requests" in error_msg:
-                    logging.warning(f"Rate Limit hit on Key #{self.current_key_idx}. Rotating...")
-                    self.current_key_idx = (self.current_key_idx + 1) % len(self.api_keys)
+                error = e
+                logging.warning(f"Error in astream attempt {attempt} on Key #{index}: {e}")
+                if not is_rate_limit_error(e) or started:
+                    raise
+            finally:
+                await self.pool.arelease(index, error)
+        raise AllKeysRateLimited("ALL API keys are currently rate-limited or exhausted.")
+
+    async def _astream_hedged(self, input, config=None, **kwargs):
+        tokens = estimate_tokens(input)
+        max_attempts = self._max_attempts()
+
+        def start(index):
+            return _StreamAttempt(self.pool, index, self._get_llm(index).astream(input, config=config, **kwargs))
+
+        attempts = [start(await self.pool.aacquire(tokens))]
+        launched, hedged = 1, False
+        winner, first, error = None, None, None
+        try:
+            while winner is None:
+                timeout = None
+                if not hedged and len(attempts) == 1:
+                    timeout = max(0.0, self.pool.hedge_delay(attempts[0].index) - (time.monotonic() - attempts[0].started))
+                pending = {attempt.first: attempt for attempt in attempts}
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # The first chunk is late: send the same request on another key and race them.
+                    hedged = True
+                    index = await self.pool.atry_acquire(tokens, exclude=[attempt.index for attempt in attempts])
+                    if index is not None:
+                        logging.info(f"No first chunk from Key #{attempts[0].index} in {timeout:.2f}s, hedging on Key #{index}.")
+                        self.pool.hedges += 1
+                        attempts.append(start(index))
+                        attempts[-1].hedge = True
+                        launched += 1
                     continue
-                else:
-                    raise e
-        raise Exception("ALL API keys are currently rate-limited or exhausted.")
+
+                for future in done:
+                    attempt = pending[future]
+                    chunk, attempt_error = future.result()
+                    if attempt_error is None:
+                        winner, first = attempt, chunk
+                        break
+                    logging.warning(f"Error in astream attempt on Key #{attempt.index}: {attempt_error}")
+                    attempts.remove(attempt)
+                    await attempt.finish(attempt_error)
+                    if attempts:
+                        continue
+                    if not is_rate_limit_error(attempt_error):
+                        raise attempt_error
+                    if launched >= max_attempts:
+                        raise AllKeysRateLimited("ALL API keys are currently rate-limited or exhausted.")
+                    attempts.append(start(await self.pool.aacquire(tokens)))
+                    launched += 1
+
+            self.pool.record_ttft(winner.index, time.monotonic() - winner.started)
+            for attempt in attempts:
+                if attempt is not winner:
+                    # The loser's wait is cut short, so it would make a slow key look fast; only count it.
+                    self.pool.record_censored(attempt.index)
+                    await attempt.finish()
+            if winner.hedge:
+                self.pool.hedge_wins += 1
+            attempts = [winner]
+
+            chunk = first
+            while chunk is not _END:
+                yield chunk
+                chunk, error = await winner.queue.get()
+                if error is not None:
+                    raise error
+        finally:
+            for attempt in attempts:
+                await attempt.finish(error)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        for attempt in range(self._max_attempts()):
+            index = await self.pool.aacquire(estimate_tokens(input))
+            error = None
+            try:
+                return await self._get_llm(index).ainvoke(input, config=config, **kwargs)
+            except Exception as e:
+                error = e
+                logging.warning(f"Error in ainvoke attempt {attempt} on Key #{index}: {e}")
+                if not is_rate_limit_error(e):
+                    raise
+            finally:
+                await self.pool.arelease(index, error)
+        raise AllKeysRateLimited("ALL API keys are currently rate-limited or exhausted.")